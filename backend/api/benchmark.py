@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from itertools import cycle, islice
+from statistics import median
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+
+def fetch(url, headers):
+    """
+    Выполняет GET-запрос и возвращает статус и время ответа.
+    """
+    started = perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers)) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    except URLError:
+        status = None
+    return status, perf_counter() - started
+
+
+def percentile(values, share):
+    """
+    Перцентиль по отсортированному списку.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_load(base_url, paths, requests, concurrency, headers=None):
+    """
+    Отправляет requests запросов по кругу из paths
+    в concurrency потоков и возвращает сводку.
+    """
+    urls = [base_url.rstrip('/') + path for path in paths]
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda url: fetch(url, headers or {}),
+            islice(cycle(urls), requests)
+        ))
+    elapsed = perf_counter() - started
+    return summarize(
+        [timing for _, timing in results],
+        sum(1 for status, _ in results if status is None or status >= 400),
+        elapsed
+    )
+
+
+def summarize(timings, errors, elapsed, queries=None):
+    """
+    Сводка по временам ответа и, если переданы, числу запросов к БД.
+    """
+    timings = sorted(timings)
+    summary = {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': len(timings) / elapsed if elapsed else 0.0,
+        'p50': median(timings) if timings else 0.0,
+        'p95': percentile(timings, 0.95),
+        'p99': percentile(timings, 0.99),
+        'max': timings[-1] if timings else 0.0,
+    }
+    if queries is not None:
+        summary['queries'] = sum(queries) / len(queries) if queries else 0.0
+        summary['queries_max'] = max(queries, default=0)
+    return summary
+
+
+def compare(result, baseline, tolerance):
+    """
+    Сравнивает результат с сохраненным базовым.
+    Возвращает список описаний регрессий: рост p95 больше чем
+    на tolerance, падение пропускной способности больше чем
+    на tolerance и рост максимального числа запросов к БД.
+    """
+    regressions = []
+    total, base_total = result['total'], baseline.get('total', {})
+    if base_total.get('rps') and total['rps'] < base_total['rps'] * (
+            1 - tolerance):
+        regressions.append(
+            f'total: rps {total["rps"]:.1f} < {base_total["rps"]:.1f}')
+    for name, current in result['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            continue
+        if base.get('p95') and current['p95'] > base['p95'] * (
+                1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {current["p95"] * 1000:.1f} мс > '
+                f'{base["p95"] * 1000:.1f} мс')
+        if ('queries_max' in base and 'queries_max' in current
+                and current['queries_max'] > base['queries_max']):
+            regressions.append(
+                f'{name}: запросов к БД {current["queries_max"]} > '
+                f'{base["queries_max"]}')
+    return regressions
+
+
+WORKLOAD = {
+    'recipe_list': 20,
+    'recipe_list_tags': 10,
+    'recipe_list_author': 5,
+    'recipe_list_favorited': 5,
+    'recipe_detail': 20,
+    'ingredient_autocomplete': 15,
+    'subscriptions': 5,
+    'download_shopping_cart': 5,
+    'favorite_toggle': 10,
+}
+
+
+class ApiWorkload:
+    """
+    Запросы к API для нагрузочного прогона внутри процесса.
+    Каждый запрос выполняется от случайного пользователя из tokens
+    по случайно выбранным рецептам, тегам, авторам и ингредиентам.
+    favorites: множество пар (пользователь, рецепт) в избранном,
+    по нему favorite_toggle выбирает добавление или удаление.
+    """
+    def __init__(self, rng, tokens, recipe_ids, author_ids, tag_slugs,
+                 prefixes, favorites):
+        self.rng = rng
+        self.tokens = tokens
+        self.recipe_ids = recipe_ids
+        self.author_ids = author_ids
+        self.tag_slugs = tag_slugs
+        self.prefixes = prefixes
+        self.favorites = favorites
+
+    def request(self, name):
+        """
+        Возвращает метод, путь и пользователя для запроса.
+        """
+        user_id = self.rng.choice(list(self.tokens))
+        return (*getattr(self, name)(user_id), user_id)
+
+    def headers(self, user_id):
+        return {'HTTP_AUTHORIZATION': f'Token {self.tokens[user_id]}'}
+
+    def recipe_list(self, user_id):
+        return 'get', '/api/recipes/'
+
+    def recipe_list_tags(self, user_id):
+        slugs = self.rng.sample(
+            self.tag_slugs, min(len(self.tag_slugs), 2))
+        return 'get', '/api/recipes/?' + urlencode(
+            [('tags', slug) for slug in slugs])
+
+    def recipe_list_author(self, user_id):
+        return 'get', '/api/recipes/?' + urlencode(
+            {'author': self.rng.choice(self.author_ids)})
+
+    def recipe_list_favorited(self, user_id):
+        return 'get', '/api/recipes/?is_favorited=1'
+
+    def recipe_detail(self, user_id):
+        return 'get', f'/api/recipes/{self.rng.choice(self.recipe_ids)}/'
+
+    def ingredient_autocomplete(self, user_id):
+        return 'get', '/api/ingredients/?' + urlencode(
+            {'name': self.rng.choice(self.prefixes)})
+
+    def subscriptions(self, user_id):
+        return 'get', '/api/users/subscriptions/'
+
+    def download_shopping_cart(self, user_id):
+        return 'get', '/api/recipes/download_shopping_cart/'
+
+    def favorite_toggle(self, user_id):
+        recipe_id = self.rng.choice(self.recipe_ids)
+        key = (user_id, recipe_id)
+        if key in self.favorites:
+            self.favorites.remove(key)
+            return 'delete', f'/api/recipes/{recipe_id}/favorite/'
+        self.favorites.add(key)
+        return 'post', f'/api/recipes/{recipe_id}/favorite/'
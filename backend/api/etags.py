@@ -0,0 +1,88 @@
+from hashlib import md5
+
+from api.viewer import get_viewer_state
+from recipes.models import Recipe
+from recipes.versions import (INGREDIENTS_VERSION, TAGS_VERSION,
+                              get_versions, version_time)
+
+
+def tags_etag(request, *args, **kwargs):
+    return catalog_versions(request)[0]
+
+
+def ingredients_etag(request, *args, **kwargs):
+    return catalog_versions(request)[1]
+
+
+def _recipe_version(request, pk):
+    """
+    Версия рецепта и данные автора, попадающие в ответ.
+    Загружается один раз за запрос.
+    """
+    if not str(pk).isdigit():
+        return None
+    cached = getattr(request, '_recipe_version', None)
+    if cached is None or cached[0] != pk:
+        cached = (pk, recipe_version_query(pk).first())
+        request._recipe_version = cached
+    return cached[1]
+
+
+def catalog_versions(request):
+    """
+    Версии каталогов тегов и ингредиентов: их названия
+    и единицы измерения входят в ответ с рецептом.
+    Загружаются одним запросом один раз за запрос.
+    """
+    versions = getattr(request, '_catalog_versions', None)
+    if versions is None:
+        versions = tuple(get_versions(TAGS_VERSION, INGREDIENTS_VERSION))
+        request._catalog_versions = versions
+    return versions
+
+
+def recipe_version_query(pk):
+    return Recipe.objects.filter(pk=pk).values_list(
+        'updated_at', 'author_id', 'author__username',
+        'author__first_name', 'author__last_name', 'author__email',
+        'author__avatar'
+    )
+
+
+def recipe_etag(request, pk=None, **kwargs):
+    """
+    ETag рецепта: версия рецепта, версии каталогов, данные автора
+    и отметки текущего пользователя.
+    """
+    row = _recipe_version(request, pk)
+    if row is None:
+        return None
+    state = get_viewer_state(request)
+    flags = ()
+    if request.user.is_authenticated:
+        flags = (
+            request.user.pk,
+            int(pk) in state.favorite_ids,
+            int(pk) in state.shopping_cart_ids,
+            row[1] in state.following_ids,
+        )
+    return md5(repr(
+        (row, catalog_versions(request), flags)).encode()).hexdigest()
+
+
+def recipe_last_modified(request, pk=None, **kwargs):
+    """
+    Дата изменения рецепта или каталогов, если они менялись позже.
+    Для авторизованных пользователей не отдается: ответ зависит
+    от их избранного, корзины и подписок.
+    """
+    if request.user.is_authenticated:
+        return None
+    row = _recipe_version(request, pk)
+    if row is None:
+        return None
+    times = [version_time(version)
+             for version in catalog_versions(request)]
+    if None in times:
+        return None
+    return max(row[0], *times)
@@ -0,0 +1,150 @@
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from core.images import check_pixels, rendition_urls, run_in_pool
+from core.uploads import UploadedImage
+from users.models import ImageUpload
+
+
+class PooledBase64ImageField(Base64ImageField):
+    """
+    Изображение в base64 или токен завершенной загрузки.
+    Декодирование и проверка выполняются в ограниченном пуле потоков.
+    """
+    def to_internal_value(self, data):
+        upload = self.get_upload(data)
+        if upload is not None:
+            return run_in_pool(self.load_upload, upload)
+        return run_in_pool(self.decode, data)
+
+    def decode(self, data):
+        return check_pixels(super().to_internal_value(data))
+
+    def get_upload(self, data):
+        """
+        Возвращает загрузку текущего пользователя по токену
+        или None, если передан не токен.
+        """
+        if not isinstance(data, str) or len(data) != 36:
+            return None
+        try:
+            token = UUID(data)
+        except ValueError:
+            return None
+        user = getattr(self.context.get('request'), 'user', None)
+        upload = ImageUpload.objects.filter(
+            token=token, user_id=getattr(user, 'pk', None)).first()
+        if upload is None or not upload.complete:
+            raise serializers.ValidationError(
+                'Загрузка не найдена или не завершена.')
+        return upload
+
+    def load_upload(self, upload):
+        try:
+            with Image.open(upload.path) as image:
+                extension = (image.format or '').lower()
+        except FileNotFoundError:
+            raise serializers.ValidationError('Загрузка уже использована.')
+        except OSError:
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        image_file = UploadedImage(
+            upload.path, name=f'{upload.token}.{extension}')
+        return check_pixels(
+            super(Base64FieldMixin, self).to_internal_value(image_file))
+
+
+class RenditionsField(serializers.Field):
+    """
+    Адреса уменьшенных вариантов изображения.
+    """
+    def __init__(self, renditions, **kwargs):
+        self.renditions = renditions
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return rendition_urls(value.name, self.renditions)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Первичный ключ, объекты для которого загружаются заранее
+    одним запросом на весь список значений.
+    Ошибки совпадают с PrimaryKeyRelatedField.
+    """
+    def __init__(self, **kwargs):
+        self.objects = None
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        """
+        Приводит значение к типу первичного ключа или возвращает None.
+        """
+        if isinstance(data, bool):
+            return None
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def prefetch(self, values):
+        """
+        Загружает объекты для всех значений одним запросом IN.
+        """
+        if self.pk_field is not None:
+            self.objects = None
+            return
+        pks = {pk for pk in map(self.to_pk, values) if pk is not None}
+        self.objects = self.get_queryset().in_bulk(pks) if pks else {}
+
+    def to_internal_value(self, data):
+        if self.objects is None:
+            return super().to_internal_value(data)
+        pk = self.to_pk(data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.objects:
+            self.fail('does_not_exist', pk_value=data)
+        return self.objects[pk]
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """
+    Список первичных ключей, разрешаемый одним запросом.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, (list, tuple)):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Список вложенных объектов, поля BulkPrimaryKeyRelatedField которых
+    разрешаются одним запросом на весь список.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                if isinstance(field, BulkPrimaryKeyRelatedField):
+                    field.prefetch([
+                        item[name] for item in data
+                        if isinstance(item, dict) and name in item
+                    ])
+        return super().to_internal_value(data)
@@ -1,7 +1,15 @@
 from django_filters import (FilterSet,
                             ModelMultipleChoiceFilter,
                             BooleanFilter, CharFilter)
+from django_filters.widgets import BooleanWidget
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower, Replace
 
+from api.etags import ingredients_etag
+from recipes.ingredient_index import (get_ingredient_index, normalize,
+                                      similar_ids)
 from recipes.models import Recipe, Tag, Ingredient
 
 
@@ -15,8 +23,10 @@ class RecipeFilter(FilterSet):
         to_field_name='slug',
         method='filter_tags',
     )
-    is_favorited = BooleanFilter(method='filter_user_list')
-    is_in_shopping_cart = BooleanFilter(method='filter_user_list')
+    is_favorited = BooleanFilter(
+        method='filter_user_list', widget=BooleanWidget())
+    is_in_shopping_cart = BooleanFilter(
+        method='filter_user_list', widget=BooleanWidget())
 
     class Meta:
         model = Recipe
@@ -40,7 +50,7 @@ class RecipeFilter(FilterSet):
             return queryset.none()
         user = self.request.user
         field_mapping = {
-            'is_favorited': 'favorites',
+            'is_favorited': 'favoriterecipe',
             'is_in_shopping_cart': 'shoppingcart'
         }
         if name in field_mapping and value:
@@ -54,7 +64,47 @@ class IngredientFilter(FilterSet):
     Фильтрация ингредиентов.
     """
     name = CharFilter(lookup_expr='istartswith',)
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Ingredient
-        fields = ('name',)
+        fields = ('name', 'search')
+
+    def filter_search(self, queryset, name, value):
+        """
+        Нечеткий поиск: сначала совпадения по началу названия,
+        затем по вхождению, затем похожие названия.
+        Название приводится к нижнему регистру с заменой ё на е,
+        как строка запроса в normalize.
+        На PostgreSQL используются индексы по этому выражению и pg_trgm,
+        на других базах похожие названия ищутся в индексе процесса.
+        """
+        value = normalize(value)
+        if not value:
+            return queryset
+        queryset = queryset.annotate(name_lower=Replace(
+            Lower('name'), Value('ё'), Value('е')))
+        prefix = Q(name_lower__startswith=value)
+        contains = Q(name_lower__contains=value)
+        if connection.vendor == 'postgresql':
+            similar = Q(name_lower__trigram_similar=value)
+            similarity = TrigramSimilarity('name_lower', value)
+        else:
+            ids = similar_ids(
+                get_ingredient_index(ingredients_etag(self.request)), value)
+            similar = Q(pk__in=ids)
+            similarity = Case(
+                *[When(pk=pk, then=Value(len(ids) - position))
+                  for position, pk in enumerate(ids)],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        return queryset.filter(prefix | contains | similar).annotate(
+            rank=Case(
+                When(prefix, then=0),
+                When(contains, then=1),
+                default=2,
+                output_field=IntegerField()
+            ),
+            similarity=similarity
+        ).order_by('rank', '-similarity', 'name')
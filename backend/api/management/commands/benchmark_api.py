@@ -0,0 +1,207 @@
+import json
+from collections import defaultdict
+from random import Random
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import WORKLOAD, ApiWorkload, compare, summarize
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Прогоняет взвешенную нагрузку по API внутри процесса "
+        "и выводит rps, p50/p95/p99 и число запросов к БД по эндпоинтам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=200,
+                            help='Запросы для прогрева, не учитываются')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Сколько пользователей отправляют запросы')
+        parser.add_argument('--sample', type=int, default=1000,
+                            help='Сколько рецептов участвует в нагрузке')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--weight', action='append', default=[],
+            help='Вес эндпоинта в виде имя=вес, 0 отключает эндпоинт')
+        parser.add_argument(
+            '--seed-users', type=int,
+            help='Сначала создать данные через seed_data с этим числом '
+                 'пользователей')
+        parser.add_argument(
+            '--seed-recipes', type=int, default=10000,
+            help='Число рецептов для seed_data')
+        parser.add_argument('--output', help='Файл для результата в JSON')
+        parser.add_argument('--baseline',
+                            help='Файл базового результата для сравнения')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимое ухудшение p95 и rps относительно базового')
+
+    def handle(self, *args, **options):
+        weights = self.weights(options['weight'])
+        rng = Random(options['seed'])
+        if options['seed_users']:
+            self.seed(options)
+        workload = self.workload(rng, options)
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG включен, результаты будут хуже, чем в продакшене.')
+        names = list(weights)
+        client = Client()
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in rng.choices(names, list(weights.values()),
+                                    k=options['warmup']):
+                self.call(client, workload, name)
+            timings = defaultdict(list)
+            queries = defaultdict(list)
+            errors = defaultdict(int)
+            started = perf_counter()
+            for name in rng.choices(names, list(weights.values()),
+                                    k=options['requests']):
+                status, timing, count = self.call(client, workload, name)
+                timings[name].append(timing)
+                queries[name].append(count)
+                errors[name] += status >= 400
+            elapsed = perf_counter() - started
+        result = {
+            'meta': {
+                'requests': options['requests'],
+                'seed': options['seed'],
+                'weights': weights,
+                'database': connection.vendor,
+                'recipes': Recipe.objects.count(),
+                'users': User.objects.count(),
+                'debug': settings.DEBUG,
+            },
+            'total': summarize(
+                [value for values in timings.values() for value in values],
+                sum(errors.values()), elapsed,
+                [value for values in queries.values() for value in values]),
+            'endpoints': {
+                name: summarize(timings[name], errors[name],
+                                elapsed, queries[name])
+                for name in names if timings[name]
+            },
+        }
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                regressions = compare(
+                    result, json.load(file), options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно базового результата:\n'
+                    + '\n'.join(regressions))
+            self.stdout.write('Регрессий относительно базового нет.')
+
+    @staticmethod
+    def weights(items):
+        weights = dict(WORKLOAD)
+        for item in items:
+            name, _, weight = item.partition('=')
+            if name not in WORKLOAD or not weight.isdigit():
+                raise CommandError(
+                    f'Неверный вес: {item}, эндпоинты: '
+                    f'{", ".join(WORKLOAD)}')
+            weights[name] = int(weight)
+        weights = {name: weight for name, weight in weights.items() if weight}
+        if not weights:
+            raise CommandError('Все эндпоинты отключены.')
+        return weights
+
+    def seed(self, options):
+        prefix = f'bench{options["seed"]}_'
+        if User.objects.filter(username__startswith=prefix).exists():
+            self.stdout.write('Данные для нагрузки уже созданы.')
+            return
+        users = options['seed_users']
+        recipes = options['seed_recipes']
+        call_command(
+            'import_ingredients', stdout=self.stdout)
+        call_command(
+            'seed_data', users=users, recipes=recipes,
+            favorites=recipes * 5, carts=users * 5, follows=users * 10,
+            seed=options['seed'], prefix=prefix, stdout=self.stdout)
+
+    @staticmethod
+    def sample_ids(queryset, count, rng):
+        """
+        Случайные существующие ключи одним запросом по диапазону.
+        """
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return []
+        candidates = {
+            rng.randint(bounds['low'], bounds['high'])
+            for _ in range(count * 2)
+        }
+        return sorted(queryset.filter(pk__in=candidates).values_list(
+            'pk', flat=True)[:count])
+
+    def workload(self, rng, options):
+        recipe_ids = self.sample_ids(Recipe.objects, options['sample'], rng)
+        user_ids = self.sample_ids(
+            User.objects.filter(is_active=True), options['users'], rng)
+        if not recipe_ids or not user_ids:
+            raise CommandError(
+                'Нет рецептов или пользователей, используйте --seed-users '
+                'или seed_data.')
+        tokens = {
+            user_id: Token.objects.get_or_create(user_id=user_id)[0].key
+            for user_id in user_ids
+        }
+        names = Ingredient.objects.filter(
+            pk__in=self.sample_ids(Ingredient.objects, 100, rng)
+        ).values_list('name', flat=True)
+        return ApiWorkload(
+            rng, tokens, recipe_ids,
+            sorted(set(Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                'author_id', flat=True))),
+            list(Tag.objects.values_list('slug', flat=True)),
+            sorted({name[:2] for name in names}) or ['а'],
+            set(FavoriteRecipe.objects.filter(
+                user_id__in=user_ids, recipe_id__in=recipe_ids
+            ).values_list('user_id', 'recipe_id'))
+        )
+
+    @staticmethod
+    def call(client, workload, name):
+        method, path, user_id = workload.request(name)
+        with CaptureQueriesContext(connection) as context:
+            started = perf_counter()
+            response = getattr(client, method)(
+                path, **workload.headers(user_id))
+            timing = perf_counter() - started
+        return response.status_code, timing, len(context.captured_queries)
+
+    def report(self, result):
+        self.stdout.write(
+            f'{"эндпоинт":<26}{"запросы":>8}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"БД":>7}{"БД max":>8}{"ошибки":>8}')
+        rows = list(result['endpoints'].items()) + [('total', result['total'])]
+        for name, row in rows:
+            self.stdout.write(
+                f'{name:<26}{row["requests"]:>8}'
+                f'{row["p50"] * 1000:>10.1f}{row["p95"] * 1000:>10.1f}'
+                f'{row["p99"] * 1000:>10.1f}{row["queries"]:>7.1f}'
+                f'{row["queries_max"]:>8}{row["errors"]:>8}')
+        self.stdout.write(f'Пропускная способность: '
+                          f'{result["total"]["rps"]:.1f} запросов/с')
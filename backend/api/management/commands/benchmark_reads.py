@@ -0,0 +1,55 @@
+from django.core.management import BaseCommand, CommandError
+
+from api.benchmark import run_load
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+)
+
+
+class Command(BaseCommand):
+
+    help = ("Нагрузочное сравнение эндпоинтов чтения на нескольких "
+            "серверах, например WSGI и ASGI")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='Сервер в виде имя=url, например asgi=http://127.0.0.1:8001'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь для запросов, можно указать несколько раз'
+        )
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--concurrency', type=int, action='append',
+            help='Число одновременных запросов, можно указать несколько раз'
+        )
+        parser.add_argument('--token', help='Токен пользователя')
+
+    def handle(self, *args, target, paths, requests, concurrency, token,
+               **options):
+        targets = []
+        for item in target:
+            name, _, url = item.partition('=')
+            if not url:
+                raise CommandError(f'Неверный сервер: {item}')
+            targets.append((name, url))
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        self.stdout.write(
+            f'{"сервер":<10}{"потоки":>8}{"rps":>10}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"p99, мс":>10}{"ошибки":>8}')
+        for workers in concurrency or (1, 10, 50):
+            for name, url in targets:
+                result = run_load(
+                    url, paths or DEFAULT_PATHS, requests, workers, headers)
+                self.stdout.write(
+                    f'{name:<10}{workers:>8}{result["rps"]:>10.1f}'
+                    f'{result["p50"] * 1000:>10.1f}'
+                    f'{result["p95"] * 1000:>10.1f}'
+                    f'{result["p99"] * 1000:>10.1f}'
+                    f'{result["errors"]:>8}')
@@ -1,12 +1,36 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from core.constans import PAGE_SIZE
 
 
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по ключу -id без COUNT и OFFSET.
+    """
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = PAGE_SIZE
+    ordering = '-id'
+
+
 class CustomPagination(PageNumberPagination):
     """
     Пагинация с параметром.
+    Параметр cursor (в том числе пустой) включает пагинацию по ключу.
     """
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = PAGE_SIZE
+    cursor_query_param = 'cursor'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,18 +1,29 @@
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.fields import RegexField
-from rest_framework.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import F, Manager, Prefetch, Window
+from django.db.models.functions import RowNumber
 
 from foodgram_backend.settings import DOMAIN
-from core.constans import MIN_COOKING_TIME, MIN_AMOUNT, MIN_LIMIT
+from core.constans import (MIN_COOKING_TIME, MIN_AMOUNT, MIN_LIMIT,
+                           RECIPE_CACHE_TIMEOUT, RECIPE_RENDITIONS,
+                           AVATAR_RENDITIONS, MIN_UPLOAD_SIZE,
+                           UPLOAD_MAX_SIZE, RECIPE_BATCH_SIZE)
+from core.images import rendition_urls
+from api.fields import (BulkListSerializer, BulkPrimaryKeyRelatedField,
+                        PooledBase64ImageField, RenditionsField)
+from api.etags import catalog_versions
 from api.mixins import ValidateBase64Mixin, ExtraKwargsMixin
-from users.models import Subscription
+from api.viewer import get_viewer_state
+from users.models import ImageUpload, Subscription
 from recipes.models import (Tag, Recipe, Ingredient, ShortLink,
                             IngredientRecipeAmountModel,
-                            FavoriteRecipe, ShoppingCart)
+                            FavoriteRecipe, ShoppingCart,
+                            ShoppingCartIngredient, TagRecipe)
+from recipes.versions import recipe_cache_keys
 
 User = get_user_model()
 
@@ -23,19 +34,17 @@ class UserSerializer(serializers.ModelSerializer, ValidateBase64Mixin):
     """
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
+    avatar_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'avatar')
+            'last_name', 'is_subscribed', 'avatar', 'avatar_renditions')
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (
-            not user.is_anonymous
-            and obj.followers.filter(user=user).exists()
-        )
+        return get_viewer_state(
+            self.context.get('request')).is_subscribed(obj)
 
     def get_avatar(self, obj):
         """
@@ -46,6 +55,14 @@ class UserSerializer(serializers.ModelSerializer, ValidateBase64Mixin):
                 return obj.avatar.url
         return None
 
+    def get_avatar_renditions(self, obj):
+        """
+        Возвращает адреса уменьшенных вариантов аватара.
+        """
+        if isinstance(obj, User):
+            return rendition_urls(obj.avatar.name, AVATAR_RENDITIONS)
+        return None
+
 
 class UserCreateSerializer(serializers.ModelSerializer, ExtraKwargsMixin):
     """
@@ -90,9 +107,11 @@ class RecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор для ответа при получении рецепта.
     """
+    image_renditions = RenditionsField(RECIPE_RENDITIONS, source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
@@ -100,8 +119,7 @@ class ListSubscriptionsSerializer(UserSerializer):
     """
     Сериализатор для получения списка подписчиков с рецептами.
     """
-    recipes_count = serializers.IntegerField(
-        source='recipe_set.count', read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
     recipes = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -112,12 +130,49 @@ class ListSubscriptionsSerializer(UserSerializer):
             'is_subscribed', 'avatar',
         )
 
-    def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipe_set.all()
-        limit = request.GET.get('recipes_limit', None)
+    @staticmethod
+    def get_recipes_limit(request):
+        """
+        Возвращает значение recipes_limit или None, если оно не задано.
+        """
+        limit = request.GET.get('recipes_limit', None) if request else None
         if limit and limit.isdigit() and int(limit) > MIN_LIMIT:
-            recipes = recipes[:int(limit)]
+            return int(limit)
+        return None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request):
+        """
+        Подгружает первые recipes_limit рецептов каждого автора
+        одним запросом с оконной функцией.
+        """
+        recipes = Recipe.objects.order_by('-id')
+        limit = cls.get_recipes_limit(request)
+        if limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=F('id').desc()
+                )
+            ).filter(row_number__lte=limit)
+        return queryset.prefetch_related(
+            Prefetch('recipe_set', queryset=recipes, to_attr='limited_recipes')
+        )
+
+    def get_is_subscribed(self, obj):
+        """
+        В списке подписок пользователь всегда подписан на автора.
+        """
+        return True
+
+    def get_recipes(self, obj):
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipe_set.order_by('-id')
+            limit = self.get_recipes_limit(self.context.get('request'))
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeSerializer(recipes, many=True).data
 
 
@@ -129,18 +184,13 @@ class SubscriptionSerializer(UserSerializer):
         model = Subscription
         fields = ('user', 'following')
 
-    def validate(self, data):
-        user = data['user']
-        following = data['following']
-        if user.id == following.id:
-            raise serializers.ValidationError('Нельзя подписаться на себя.')
-        if following.subscriptions.filter(user=user).exists():
-            raise serializers.ValidationError('Подписка уже есть.')
-        return data
-
     def to_representation(self, instance):
+        following = ListSubscriptionsSerializer.setup_eager_loading(
+            User.objects.filter(pk=instance.following_id),
+            self.context.get('request')
+        ).get()
         return ListSubscriptionsSerializer(
-            instance.following,
+            following,
             context=self.context
         ).data
 
@@ -152,13 +202,35 @@ class UserAvatarUpdateSerializer(
     """
     Сериализатор для обновления аватара пользователя.
     """
-    avatar = Base64ImageField(required=True)
+    avatar = PooledBase64ImageField(required=True)
 
     class Meta:
         model = User
         fields = ('avatar',)
 
 
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор загрузки изображения по частям.
+    """
+    complete = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = ImageUpload
+        fields = ('token', 'size', 'received', 'complete')
+        read_only_fields = ('token', 'received')
+
+    def validate_size(self, value):
+        """
+        Проверяет, что размер загрузки в допустимых пределах.
+        """
+        if not MIN_UPLOAD_SIZE <= value <= UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Размер должен быть от {MIN_UPLOAD_SIZE} '
+                f'до {UPLOAD_MAX_SIZE} байт.')
+        return value
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """
     Сериализатор для промежуточной модели рецепты/ингредиенты.
@@ -175,6 +247,15 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class CachedRecipeListSerializer(serializers.ListSerializer):
+    """
+    Список рецептов с чтением представлений из кеша одним запросом.
+    """
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.cached_representations(list(recipes))
+
+
 class RecipeGETSerializer(serializers.ModelSerializer):
     """
     Этот сериализатор используется для получения полной информации о рецепте,
@@ -185,31 +266,111 @@ class RecipeGETSerializer(serializers.ModelSerializer):
         many=True, source='ingredient_amounts',
         required=True)
     author = UserSerializer(read_only=True)
-    is_favorited = serializers.BooleanField(default=False)
-    is_in_shopping_cart = serializers.BooleanField(default=False)
-    image = Base64ImageField(required=True)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    image = serializers.ImageField(read_only=True)
+    image_renditions = RenditionsField(RECIPE_RENDITIONS, source='image')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'name', 'text', 'cooking_time',
             'author', 'is_favorited', 'is_in_shopping_cart',
-            'image', 'ingredients',
+            'image', 'image_renditions', 'ingredients',
         )
         read_only_fields = ('author', 'tags', 'ingredients')
+        list_serializer_class = CachedRecipeListSerializer
+
+    def get_is_favorited(self, obj):
+        return get_viewer_state(
+            self.context.get('request')).is_favorited(obj)
+
+    def get_is_in_shopping_cart(self, obj):
+        return get_viewer_state(
+            self.context.get('request')).is_in_shopping_cart(obj)
+
+    def to_representation(self, instance):
+        return self.cached_representations([instance])[0]
+
+    def cached_representations(self, recipes):
+        """
+        Представления рецептов: общая для всех пользователей часть
+        берется из кеша, отсутствующие рецепты догружаются одним запросом.
+        Отметки текущего пользователя накладываются поверх.
+        """
+        request = self.context.get('request')
+        versions = catalog_versions(request) if request else None
+        keys = recipe_cache_keys(recipes, versions)
+        cached = cache.get_many(keys.values())
+        missing = [pk for pk, key in keys.items() if key not in cached]
+        if missing:
+            fresh = list(
+                Recipe.objects.filter(pk__in=missing).with_related())
+            fresh_data = self.render_fresh(
+                fresh, recipe_cache_keys(fresh, versions), keys, cached)
+            cache.set_many(fresh_data, RECIPE_CACHE_TIMEOUT)
+        return self.apply_viewer_many(recipes, keys, cached)
+
+    @staticmethod
+    def render_fresh(fresh, fresh_keys, keys, cached):
+        """
+        Представления догруженных рецептов без данных пользователя.
+        Дополняет keys и cached и возвращает новые записи кеша.
+        """
+        base_serializer = RecipeGETSerializer(context={})
+        fresh_data = {
+            fresh_keys[recipe.pk]: serializers.ModelSerializer
+            .to_representation(base_serializer, recipe)
+            for recipe in fresh
+        }
+        cached.update(fresh_data)
+        keys.update(fresh_keys)
+        return fresh_data
+
+    def apply_viewer_many(self, recipes, keys, cached):
+        return [
+            self.apply_viewer(cached[keys[recipe.pk]])
+            for recipe in recipes if keys[recipe.pk] in cached
+        ]
+
+    def apply_viewer(self, base):
+        """
+        Добавляет к закешированному представлению отметки пользователя
+        и абсолютные адреса изображения и его вариантов.
+        """
+        request = self.context.get('request')
+        state = get_viewer_state(request)
+        data = dict(base)
+        data['author'] = dict(
+            base['author'],
+            is_subscribed=base['author']['id'] in state.following_ids
+        )
+        data['is_favorited'] = base['id'] in state.favorite_ids
+        data['is_in_shopping_cart'] = base['id'] in state.shopping_cart_ids
+        if request is not None and data['image']:
+            data['image'] = request.build_absolute_uri(data['image'])
+            data['image_renditions'] = {
+                rendition: {
+                    fmt: request.build_absolute_uri(url)
+                    for fmt, url in urls.items()
+                }
+                for rendition, urls in data['image_renditions'].items()
+            }
+        return data
 
 
 class IngredientCreateSerializer(serializers.ModelSerializer):
     """
     Серилизатор для Проверки ингредиента при создании рецепта.
     """
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(), required=True)
     amount = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = IngredientRecipeAmountModel
         fields = ('id', 'amount')
+        list_serializer_class = BulkListSerializer
 
     def validate_amount(self, value):
         """
@@ -225,11 +386,11 @@ class RecipeCreateSerializer(serializers.ModelSerializer, ValidateBase64Mixin):
     """
     Сериализатор для создания и обновления рецептов.
     """
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all(), required=True)
     ingredients = IngredientCreateSerializer(
         many=True, write_only=True, required=True)
-    image = Base64ImageField(required=True)
+    image = PooledBase64ImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -263,16 +424,89 @@ class RecipeCreateSerializer(serializers.ModelSerializer, ValidateBase64Mixin):
     def update(self, instance, validated_data):
         """
         Обновляет экземпляр модели Recipe.
+        Записываются только изменившиеся поля, теги и ингредиенты,
+        неизмененный рецепт не сохраняется.
         """
-        tags = validated_data.pop('tags', [])
-        ingredients = validated_data.pop('ingredients', [])
-        instance = super().update(instance, validated_data)
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients(instance, ingredients)
-        instance.save()
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        changed = bool(changed_fields)
+        if tags is not None:
+            changed |= self.update_tags(instance, tags)
+        if ingredients is not None:
+            changed |= self.update_ingredients(instance, ingredients)
+        if changed:
+            instance.save(update_fields=changed_fields + ['updated_at'])
         return instance
 
+    def update_tags(self, recipe, tags):
+        """
+        Приводит теги рецепта к переданным, возвращает признак изменения.
+        """
+        old_ids = set(TagRecipe.objects.filter(
+            recipe=recipe).values_list('tag_id', flat=True))
+        new_ids = {tag.id for tag in tags}
+        if old_ids == new_ids:
+            return False
+        if old_ids - new_ids:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=old_ids - new_ids).delete()
+        TagRecipe.objects.bulk_create([
+            TagRecipe(recipe=recipe, tag_id=tag_id)
+            for tag_id in new_ids - old_ids
+        ])
+        return True
+
+    def update_ingredients(self, recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к переданным и переносит изменения
+        в списки покупок, возвращает признак изменения.
+        """
+        old_rows = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in
+            IngredientRecipeAmountModel.objects.filter(
+                recipe=recipe).values_list('id', 'ingredient_id', 'amount')
+        }
+        new_amounts = {
+            ingredient_data['id'].id: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        deltas = {
+            ingredient_id: new_amounts.get(ingredient_id, 0) - amount
+            for ingredient_id, (_, amount) in old_rows.items()
+        }
+        for ingredient_id, amount in new_amounts.items():
+            if ingredient_id not in old_rows:
+                deltas[ingredient_id] = amount
+        if not any(deltas.values()):
+            return False
+        removed = [
+            pk for ingredient_id, (pk, _) in old_rows.items()
+            if ingredient_id not in new_amounts
+        ]
+        if removed:
+            IngredientRecipeAmountModel.objects.filter(pk__in=removed).delete()
+        IngredientRecipeAmountModel.objects.bulk_update([
+            IngredientRecipeAmountModel(
+                pk=pk, amount=new_amounts[ingredient_id])
+            for ingredient_id, (pk, amount) in old_rows.items()
+            if new_amounts.get(ingredient_id, amount) != amount
+        ], ['amount'])
+        IngredientRecipeAmountModel.objects.bulk_create([
+            IngredientRecipeAmountModel(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in old_rows
+        ])
+        ShoppingCartIngredient.objects.apply_recipe_deltas(recipe.id, deltas)
+        return True
+
     @transaction.atomic
     def create_ingredients(self, recipe, ingredients_data):
         """
@@ -322,34 +556,19 @@ class RecipeResponseSerializer(serializers.ModelSerializer):
     Сериализатор для ответа при добавлении рецепта
     в список покупок или избранное.
     """
+    image_renditions = RenditionsField(RECIPE_RENDITIONS, source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
 
 class BaseUserRecipeSerializer(serializers.ModelSerializer):
     """
     Базовый сериализатор для объектов пользователь/рецепт.
+    Запись выполняется менеджером модели одним запросом,
+    сериализатор формирует ответ.
     """
-    def validate(self, attrs):
-        user = self.context['request'].user
-        recipe = attrs.get('recipe')
-        if self.context['request'].method == 'POST':
-            if self.Meta.model.objects.filter(
-                user=user, recipe=recipe
-            ).exists():
-                raise ValidationError('Рецепт уже добавлен в этот список.')
-        if self.context['request'].method == 'DELETE':
-            if not self.Meta.model.objects.filter(
-                user=user, recipe=recipe
-            ).exists():
-                raise ValidationError('Рецепт не найден в этом списке.')
-
-        return attrs
-
-    def create(self, validated_data):
-        return self.Meta.model.objects.create(**validated_data)
-
     def to_representation(self, instance):
         """
         Метод для добавления дополнительной информации
@@ -382,6 +601,17 @@ class ShoppingCartSerializer(BaseUserRecipeSerializer):
         fields = ('id', 'recipe', 'user')
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Сериализатор списка рецептов для пакетного добавления и удаления.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_SIZE
+    )
+
+
 class ShortLinkSerializer(serializers.ModelSerializer):
     """
     Сериализатор для короткой ссылки.
@@ -0,0 +1,55 @@
+import csv
+import json
+
+from core.constans import CSV_HEADERS
+
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer: возвращает записанную строку.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_txt(rows):
+    """
+    Список покупок в текстовом виде.
+    """
+    yield 'Список покупок:\n'
+    empty = True
+    for name, amount, unit in rows:
+        empty = False
+        yield f'{name} - {amount} {unit}\n'
+    if empty:
+        yield 'Ваш список покупок пуст.\n'
+
+
+def iter_csv(rows):
+    """
+    Список покупок в формате CSV.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADERS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_json(rows):
+    """
+    Список покупок в формате JSON.
+    """
+    separator = ''
+    yield '['
+    for name, amount, unit in rows:
+        item = {'name': name, 'amount': amount, 'measurement_unit': unit}
+        yield separator + json.dumps(item, ensure_ascii=False)
+        separator = ', '
+    yield ']\n'
+
+
+EXPORTERS = {
+    'txt': iter_txt,
+    'csv': iter_csv,
+    'json': iter_json,
+}
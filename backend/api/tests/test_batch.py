@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (FavoriteRecipe, Ingredient,
+                            IngredientRecipeAmountModel, Recipe,
+                            ShoppingCart, ShoppingCartIngredient)
+
+User = get_user_model()
+
+
+class BatchTests(TestCase):
+    """
+    Пакетное добавление и удаление рецептов в избранное и корзину.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия')
+        cls.salt = Ingredient.objects.create(name='соль',
+                                             measurement_unit='г')
+        cls.bread, cls.pie = [
+            Recipe.objects.create(
+                author=cls.user, name=name, text='Текст', cooking_time=5,
+                image='media/recipes/test.png')
+            for name in ('Хлеб', 'Пирог')
+        ]
+        IngredientRecipeAmountModel.objects.bulk_create([
+            IngredientRecipeAmountModel(recipe=recipe, ingredient=cls.salt,
+                                        amount=amount)
+            for recipe, amount in ((cls.bread, 5), (cls.pie, 2))
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, method, url, recipes):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipes}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['status'])
+                for item in response.json()['results']]
+
+    def counters(self, field):
+        return list(Recipe.objects.filter(
+            pk__in=(self.bread.pk, self.pie.pk)).order_by('pk')
+            .values_list(field, flat=True))
+
+    def cart_total(self):
+        return ShoppingCartIngredient.objects.filter(
+            user=self.user, ingredient=self.salt).values_list(
+                'amount', flat=True).first()
+
+    def test_favorites(self):
+        url = '/api/recipes/favorite/'
+        missing = self.pie.pk + 100
+        self.assertEqual(
+            self.batch('post', url, [self.bread.pk, missing, self.bread.pk]),
+            [(self.bread.pk, 'added'), (missing, 'not_found')])
+        self.assertEqual(
+            self.batch('post', url, [self.pie.pk, self.bread.pk]),
+            [(self.pie.pk, 'added'), (self.bread.pk, 'already_added')])
+        self.assertEqual(self.counters('favorites_count'), [1, 1])
+        self.assertEqual(
+            self.batch('delete', url, [self.bread.pk, missing, self.bread.pk]),
+            [(self.bread.pk, 'removed'), (missing, 'not_found')])
+        self.assertEqual(
+            self.batch('delete', url, [self.bread.pk, self.pie.pk]),
+            [(self.bread.pk, 'not_in_list'), (self.pie.pk, 'removed')])
+        self.assertEqual(self.counters('favorites_count'), [0, 0])
+        self.assertFalse(FavoriteRecipe.objects.exists())
+
+    def test_shopping_cart(self):
+        url = '/api/recipes/shopping_cart/'
+        self.assertEqual(
+            self.batch('post', url, [self.bread.pk, self.pie.pk]),
+            [(self.bread.pk, 'added'), (self.pie.pk, 'added')])
+        self.assertEqual(self.batch('post', url, [self.pie.pk]),
+                         [(self.pie.pk, 'already_added')])
+        self.assertEqual(self.counters('shopping_cart_count'), [1, 1])
+        self.assertEqual(self.cart_total(), 7)
+        self.assertEqual(self.batch('delete', url, [self.bread.pk]),
+                         [(self.bread.pk, 'removed')])
+        self.assertEqual(self.counters('shopping_cart_count'), [0, 1])
+        self.assertEqual(self.cart_total(), 2)
+
+    def test_invalid(self):
+        for data in ({}, {'recipes': []}, {'recipes': ['x']}):
+            with self.subTest(data=data):
+                response = self.client.post(
+                    '/api/recipes/favorite/', data, format='json')
+                self.assertEqual(response.status_code, 400)
+        response = APIClient().post(
+            '/api/recipes/favorite/', {'recipes': [self.bread.pk]},
+            format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class BatchDeletedRecipeTests(TransactionTestCase):
+    """
+    Рецепт, удаленный после проверки, получает статус not_found.
+    """
+    @mock.patch('recipes.signals.schedule_renditions')
+    def test_recipe_deleted_before_insert(self, schedule):
+        user = User.objects.create(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия')
+        bread, pie = [
+            Recipe.objects.create(
+                author=user, name=name, text='Текст', cooking_time=5,
+                image='media/recipes/test.png')
+            for name in ('Хлеб', 'Пирог')
+        ]
+        add_recipes = ShoppingCart.objects.add_recipes
+
+        def delete_and_add(user_id, recipe_ids):
+            if pie.pk in recipe_ids:
+                Recipe.objects.filter(pk=pie.pk)._raw_delete('default')
+            return add_recipes(user_id, recipe_ids)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(ShoppingCart.objects, 'add_recipes',
+                               delete_and_add):
+            response = client.post(
+                '/api/recipes/shopping_cart/',
+                {'recipes': [bread.pk, pie.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'id': bread.pk, 'status': 'added'},
+            {'id': pie.pk, 'status': 'not_found'},
+        ])
+        self.assertEqual(list(ShoppingCart.objects.values_list(
+            'recipe_id', flat=True)), [bread.pk])
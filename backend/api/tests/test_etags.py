@@ -0,0 +1,98 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, IngredientRecipeAmountModel, Recipe,
+                            Tag, TagRecipe)
+
+User = get_user_model()
+
+
+class RecipeETagTests(TestCase):
+    """
+    Условные запросы рецепта сбрасываются при изменении рецепта
+    и каталогов тегов и ингредиентов.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Каша', text='Текст', cooking_time=5,
+            image='media/recipes/test.png')
+        TagRecipe.objects.create(recipe=cls.recipe, tag=cls.tag)
+        IngredientRecipeAmountModel.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=5)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.path = f'/api/recipes/{self.recipe.pk}/'
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.path, **headers)
+
+    def test_unchanged_recipe_not_modified(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_recipe_update_changes_etag(self):
+        etag = self.get()['ETag']
+        self.recipe.name = 'Овсянка'
+        self.recipe.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Овсянка')
+
+    def test_tag_rename_changes_etag(self):
+        etag = self.get()['ETag']
+        self.tag.name = 'Обед'
+        self.tag.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['tags'][0]['name'], 'Обед')
+
+    def test_ingredient_rename_changes_etag(self):
+        etag = self.get()['ETag']
+        self.ingredient.name = 'сахар'
+        self.ingredient.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['ingredients'][0]['name'], 'сахар')
+
+
+class CatalogETagTests(TestCase):
+    """
+    Версии каталогов хранятся в БД: их обновление командой управления
+    видно API, а сброс кеша при перезапуске не меняет ETag.
+    """
+    def get_etag(self, path, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return APIClient().get(path, **headers)
+
+    def test_import_command_changes_etag(self):
+        etag = self.get_etag('/api/ingredients/')['ETag']
+        cache.clear()
+        self.assertEqual(
+            self.get_etag('/api/ingredients/', etag).status_code, 304)
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.csv', encoding='utf-8') as file:
+            file.write('перец,г\n')
+            file.flush()
+            call_command('import_ingredients', file.name, stdout=StringIO())
+        response = self.get_etag('/api/ingredients/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('перец', [item['name'] for item in response.json()])
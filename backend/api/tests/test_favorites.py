@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+User = get_user_model()
+
+
+class UserRecipeEndpointTests(TestCase):
+    """
+    Добавление и удаление одного рецепта в избранном и корзине.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Хлеб', text='Текст', cooking_time=5,
+            image='media/recipes/test.png')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, pk, action):
+        return getattr(self.client, method)(f'/api/recipes/{pk}/{action}/')
+
+    def test_non_numeric_pk(self):
+        for action in ('favorite', 'shopping_cart'):
+            for method in ('post', 'delete'):
+                for pk in ('abc', '1a', '-1'):
+                    with self.subTest(action=action, method=method, pk=pk):
+                        self.assertEqual(
+                            self.request(method, pk, action).status_code, 404)
+
+    def test_missing_recipe(self):
+        for action in ('favorite', 'shopping_cart'):
+            for method in ('post', 'delete'):
+                with self.subTest(action=action, method=method):
+                    self.assertEqual(self.request(
+                        method, self.recipe.pk + 100, action).status_code,
+                        404)
+
+    def test_add_and_remove(self):
+        for action, model in (('favorite', FavoriteRecipe),
+                              ('shopping_cart', ShoppingCart)):
+            with self.subTest(action=action):
+                pk = self.recipe.pk
+                self.assertEqual(
+                    self.request('post', pk, action).status_code, 201)
+                self.assertEqual(
+                    self.request('post', pk, action).status_code, 400)
+                self.assertTrue(model.objects.filter(
+                    user=self.user, recipe=self.recipe).exists())
+                self.assertEqual(
+                    self.request('delete', pk, action).status_code, 204)
+                self.assertEqual(
+                    self.request('delete', pk, action).status_code, 400)
@@ -0,0 +1,77 @@
+from django.test import TestCase
+from rest_framework import serializers
+
+from api.fields import BulkListSerializer, BulkPrimaryKeyRelatedField
+from recipes.models import Ingredient, Tag
+
+
+class TagsSerializer(serializers.Serializer):
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+
+
+class PlainTagsSerializer(serializers.Serializer):
+    tags = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Tag.objects.all())
+
+
+class IngredientSerializer(serializers.Serializer):
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+
+    class Meta:
+        list_serializer_class = BulkListSerializer
+
+
+class PlainIngredientSerializer(serializers.Serializer):
+    id = serializers.PrimaryKeyRelatedField(
+        queryset=Ingredient.objects.all())
+
+
+class BulkPrimaryKeyRelatedFieldTests(TestCase):
+    """
+    Ошибки пакетного поля совпадают с PrimaryKeyRelatedField,
+    а объекты загружаются одним запросом.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.salt = Ingredient.objects.create(name='соль',
+                                             measurement_unit='г')
+
+    def errors(self, serializer_class, data, **kwargs):
+        serializer = serializer_class(data=data, **kwargs)
+        self.assertFalse(serializer.is_valid())
+        return serializer.errors
+
+    def test_many_errors(self):
+        missing = self.tag.pk + 100
+        for values in ([self.tag.pk, missing], [missing, str(missing)],
+                       ['x', True, None], 'x'):
+            with self.subTest(values=values):
+                data = {'tags': values}
+                errors = self.errors(TagsSerializer, data)
+                self.assertEqual(errors,
+                                 self.errors(PlainTagsSerializer, data))
+        self.assertEqual(errors['tags'][0].code, 'not_a_list')
+
+    def test_does_not_exist_per_item(self):
+        missing = self.tag.pk + 100
+        errors = self.errors(TagsSerializer, {'tags': [missing]})
+        self.assertEqual(errors['tags'][0].code, 'does_not_exist')
+        self.assertIn(str(missing), errors['tags'][0])
+
+    def test_list_errors(self):
+        missing = self.salt.pk + 100
+        data = [{'id': self.salt.pk}, {'id': missing}, {'id': 'x'}, {}]
+        errors = self.errors(IngredientSerializer, data, many=True)
+        self.assertEqual(
+            errors, self.errors(PlainIngredientSerializer, data, many=True))
+        self.assertEqual(errors[1]['id'][0].code, 'does_not_exist')
+        self.assertEqual(errors[2]['id'][0].code, 'incorrect_type')
+
+    def test_single_query(self):
+        second = Tag.objects.create(name='Обед', slug='lunch')
+        serializer = TagsSerializer(data={'tags': [self.tag.pk, second.pk]})
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['tags'],
+                         [self.tag, second])
@@ -0,0 +1,207 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from threading import BoundedSemaphore, Event
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from core.constans import (RECIPE_RENDITIONS, RENDITION_FORMATS,
+                           SEED_PLACEHOLDER)
+from core.images import (ImagePoolBusy, make_renditions, rendition_name,
+                         rendition_urls, run_in_pool, schedule_renditions)
+from recipes.models import Ingredient, Recipe
+from recipes.seed import placeholder_image
+
+User = get_user_model()
+
+
+class RunInPoolTests(SimpleTestCase):
+    """
+    Ограничение числа задач обработки изображений.
+    """
+    def test_slot_held_until_task_finishes(self):
+        started, release = Event(), Event()
+
+        def task():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        with mock.patch('core.images.slots', BoundedSemaphore(1)), \
+                mock.patch('core.images.IMAGE_TIMEOUT', 0.05):
+            with self.assertRaises(ImagePoolBusy):
+                run_in_pool(task)
+            self.assertTrue(started.wait(5))
+            with self.assertRaises(ImagePoolBusy):
+                run_in_pool(lambda: 'next')
+            release.set()
+            with mock.patch('core.images.IMAGE_TIMEOUT', 5):
+                self.assertEqual(run_in_pool(lambda: 'next'), 'next')
+
+
+@mock.patch('recipes.signals.schedule_renditions')
+class RecipeRenditionsScheduleTests(TestCase):
+    """
+    Варианты изображения рецепта создаются только при его изменении.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+
+    def create(self):
+        return Recipe.objects.create(
+            author=self.author, name='Каша', text='Текст', cooking_time=5,
+            image='media/recipes/first.png')
+
+    def test_created(self, schedule):
+        self.create()
+        schedule.assert_called_once()
+        self.assertEqual(schedule.call_args.args[0],
+                         'media/recipes/first.png')
+
+    def test_full_save_without_image_change(self, schedule):
+        recipe = Recipe.objects.get(pk=self.create().pk)
+        schedule.reset_mock()
+        recipe.name = 'Овсянка'
+        recipe.save()
+        recipe.save(update_fields=['name'])
+        schedule.assert_not_called()
+
+    def test_image_change(self, schedule):
+        recipe = Recipe.objects.get(pk=self.create().pk)
+        schedule.reset_mock()
+        recipe.image = 'media/recipes/second.png'
+        recipe.save()
+        schedule.assert_called_once()
+        self.assertEqual(schedule.call_args.args[0],
+                         'media/recipes/second.png')
+
+
+class RenditionsTests(TestCase):
+    """
+    Создание вариантов изображения и их адреса.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_urls_fall_back_to_original(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, 'PNG')
+        name = default_storage.save('recipes/urls.png',
+                                    ContentFile(buffer.getvalue()))
+        original = default_storage.url(name)
+        urls = rendition_urls(name, RECIPE_RENDITIONS)
+        self.assertEqual(
+            {url for formats in urls.values() for url in formats.values()},
+            {original})
+        make_renditions(name, RECIPE_RENDITIONS)
+        urls = rendition_urls(name, RECIPE_RENDITIONS)
+        self.assertEqual(
+            urls['thumbnail']['webp'],
+            default_storage.url(rendition_name(name, 'thumbnail', 'webp')))
+
+    def test_failure_logged(self):
+        executor = ThreadPoolExecutor(1)
+        with mock.patch('core.images.executor', executor), \
+                self.assertLogs('core.images', 'ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_renditions('recipes/missing.png', RECIPE_RENDITIONS)
+            executor.shutdown(wait=True)
+        self.assertIn('recipes/missing.png', logs.output[0])
+
+
+class RecipeRenditionsDeleteTests(TestCase):
+    """
+    Варианты изображения удаляются вместе с рецептом.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_recipes(self, image, count=1):
+        author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+        with mock.patch('recipes.signals.schedule_renditions'):
+            return [
+                Recipe.objects.create(
+                    author=author, name='Каша', text='Текст',
+                    cooking_time=5, image=image)
+                for _ in range(count)
+            ]
+
+    def stored(self, name):
+        """
+        Существующие файлы изображения и его вариантов.
+        """
+        names = [name] + [
+            rendition_name(name, rendition, fmt)
+            for rendition in RECIPE_RENDITIONS for fmt in RENDITION_FORMATS
+        ]
+        return [name for name in names if default_storage.exists(name)]
+
+    def test_recipe_deleted(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, 'PNG')
+        name = default_storage.save('recipes/image.png',
+                                    ContentFile(buffer.getvalue()))
+        make_renditions(name, RECIPE_RENDITIONS)
+        self.assertEqual(len(self.stored(name)), 5)
+        recipe, = self.create_recipes(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.stored(name), [])
+
+    @mock.patch('recipes.signals.schedule_renditions')
+    def test_seed_placeholder_kept(self, schedule):
+        self.assertEqual(placeholder_image(), SEED_PLACEHOLDER)
+        first, second = self.create_recipes(SEED_PLACEHOLDER, count=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second.image = 'recipes/other.png'
+            second.save()
+        self.assertEqual(len(self.stored(SEED_PLACEHOLDER)), 5)
+
+    @mock.patch('recipes.signals.schedule_renditions')
+    def test_seed_data_placeholder_kept(self, schedule):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        call_command(
+            'seed_data', users=3, recipes=4, favorites=2, carts=2,
+            follows=2, tags=2, stdout=StringIO())
+        self.assertEqual(len(self.stored(SEED_PLACEHOLDER)), 5)
+        first, second = Recipe.objects.filter(
+            image=SEED_PLACEHOLDER)[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second.image = 'recipes/other.png'
+            second.save()
+            Recipe.objects.all().delete()
+        self.assertEqual(len(self.stored(SEED_PLACEHOLDER)), 5)
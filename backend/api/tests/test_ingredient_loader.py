@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.test import SimpleTestCase
+
+from recipes.ingredient_loader import iter_json_array, read_json
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """
+    Потоковое чтение JSON-массива.
+    """
+    def items(self, text, read_size=4):
+        return list(iter_json_array(StringIO(text), read_size))
+
+    def test_empty_array(self):
+        for text in ('[]', ' [ ] \n'):
+            self.assertEqual(self.items(text), [])
+
+    def test_values_split_across_reads(self):
+        text = '[123456, "длинная строка", {"name": "соль"}, [1, 2], true]'
+        expected = [123456, 'длинная строка', {'name': 'соль'}, [1, 2], True]
+        for read_size in (1, 2, 3, 7, 100):
+            self.assertEqual(self.items(text, read_size), expected)
+
+    def test_malformed(self):
+        for text in ('', '{}', '[1', '[1,', '[1,]', '[1 2]', '[,1]',
+                     '["a]', '[1]x', '[1] [2]', '[]]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.items(text)
+
+    def test_read_json_objects(self):
+        rows = read_json(StringIO(
+            '[{"name": "соль", "measurement_unit": "г"}, {"name": "мука"}]'),
+            read_size=5)
+        self.assertEqual(list(rows), [('соль', 'г'), ('мука', '')])
+        with self.assertRaises(ValueError):
+            list(read_json(StringIO('[1]')))
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import Ingredient
+
+
+class IngredientSearchTests(TestCase):
+    """
+    Нечеткий поиск ингредиентов не различает ё и е.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('ёжевика', 'ежевичный джем', 'свёкла', 'соль')
+        ])
+
+    def setUp(self):
+        cache.clear()
+        invalidate_ingredient_index()
+
+    def search(self, value):
+        response = APIClient().get('/api/ingredients/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_yo_in_query(self):
+        self.assertCountEqual(self.search('ёж'), ['ёжевика', 'ежевичный джем'])
+
+    def test_yo_in_name(self):
+        self.assertCountEqual(self.search('еж'), ['ёжевика', 'ежевичный джем'])
+
+    def test_contains(self):
+        self.assertEqual(self.search('векл'), ['свёкла'])
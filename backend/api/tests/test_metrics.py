@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from core.metrics import (Registry, RequestStats, TimedJSONRenderer, current,
+                          metrics_view, record_query)
+from recipes.models import Tag
+
+
+@override_settings(
+    MIDDLEWARE=['core.metrics.MetricsMiddleware'] + settings.MIDDLEWARE)
+class MetricsMiddlewareTests(TestCase):
+    """
+    Показатели запросов по представлениям.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        patcher = mock.patch('core.metrics.registry', Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counters(self):
+        with connection.execute_wrapper(record_query):
+            responses = [self.client.get('/api/tags/') for _ in range(2)]
+            self.client.get('/api/tags/0/')
+        series = self.registry.series[('tags-list', 'GET')]
+        self.assertEqual(series.count, 2)
+        self.assertGreaterEqual(series.queries, 2)
+        self.assertGreater(series.db_time, 0)
+        self.assertEqual(series.response_bytes,
+                         sum(len(response.content) for response in responses))
+        self.assertEqual(self.registry.statuses[('tags-list', 'GET', 200)],
+                         2)
+        self.assertEqual(self.registry.statuses[('tags-detail', 'GET', 404)],
+                         1)
+
+    def test_render(self):
+        self.client.get('/api/tags/')
+        self.client.get('/unknown/')
+        text = self.registry.render()
+        self.assertIn('foodgram_requests_total{view="tags-list",method="GET"',
+                      text)
+        self.assertIn('view="unresolved"', text)
+        self.assertIn('foodgram_request_duration_seconds_bucket', text)
+        self.assertIn('le="+Inf"} 1', text)
+
+
+class TimedJSONRendererTests(SimpleTestCase):
+    """
+    Время рендеринга учитывается только внутри запроса.
+    """
+    def test_render_time(self):
+        renderer = TimedJSONRenderer()
+        self.assertEqual(renderer.render({'id': 1}), b'{"id":1}')
+        stats = RequestStats()
+        token = current.set(stats)
+        try:
+            renderer.render({'id': 1})
+        finally:
+            current.reset(token)
+        self.assertGreater(stats.render_time, 0)
+
+
+class MetricsAccessTests(SimpleTestCase):
+    """
+    Метрики доступны только с токеном.
+    """
+    def get(self, **headers):
+        return metrics_view(RequestFactory().get(
+            '/metrics/', REMOTE_ADDR='127.0.0.1', headers=headers))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        response = self.get(Authorization='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_internal_address_without_token(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(
+            self.get(Authorization='Bearer wrong').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_closes_metrics(self):
+        self.assertEqual(self.get(Authorization='Bearer ').status_code, 403)
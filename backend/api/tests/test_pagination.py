@@ -0,0 +1,70 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Пагинация списка рецептов по ключу -id.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+        cls.recipes = Recipe.objects.bulk_create([
+            Recipe(author=cls.author, name=f'Рецепт {index}', text='Текст',
+                   cooking_time=5, image='media/recipes/test.png')
+            for index in range(5)
+        ])
+
+    def get(self, params):
+        response = APIClient().get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, on_page=None):
+        """
+        Проходит все страницы по ссылкам next и возвращает id рецептов.
+        """
+        ids = []
+        params = {'cursor': '', 'limit': 2}
+        while True:
+            page = self.get(params)
+            self.assertNotIn('count', page)
+            ids.extend(recipe['id'] for recipe in page['results'])
+            if on_page is not None:
+                on_page()
+            if page['next'] is None:
+                return ids
+            params = {key: values[0] for key, values in
+                      parse_qs(urlparse(page['next']).query).items()}
+
+    def test_order(self):
+        expected = sorted((recipe.pk for recipe in Recipe.objects.all()),
+                          reverse=True)
+        self.assertEqual(self.walk(), expected)
+        self.assertEqual(self.get({'cursor': '', 'limit': 2})['previous'],
+                         None)
+
+    def test_stable_with_new_recipes(self):
+        expected = sorted((recipe.pk for recipe in Recipe.objects.all()),
+                          reverse=True)
+
+        def add_recipe():
+            Recipe.objects.create(
+                author=self.author, name='Новый', text='Текст',
+                cooking_time=5, image='media/recipes/test.png')
+
+        self.assertEqual(self.walk(add_recipe), expected)
+
+    def test_page_number_without_cursor(self):
+        page = self.get({'limit': 2, 'page': 2})
+        self.assertEqual(page['count'], len(self.recipes))
+        self.assertEqual(len(page['results']), 2)
@@ -0,0 +1,299 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.pagination import CustomPagination
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import (FavoriteRecipe, Ingredient,
+                            IngredientRecipeAmountModel, Recipe, ShoppingCart,
+                            ShoppingCartIngredient, ShortLink, Tag, TagRecipe)
+from recipes.short_links import local_cache, make_code
+from users.models import ImageUpload, Subscription
+
+User = get_user_model()
+
+SIZES = (1, 50)
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNo'
+    'AAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+def recipe_payload(data):
+    return {
+        'name': 'Новый', 'text': 'Описание', 'cooking_time': 10,
+        'image': PNG, 'tags': data['tags'],
+        'ingredients': [
+            {'id': pk, 'amount': 2} for pk in data['ingredients']
+        ],
+    }
+
+
+# Маршрут, метод, путь, тело запроса, ожидаемый статус, бюджет запросов.
+# Путь и тело заполняются ключами из данных build_data, бюджет должен
+# соблюдаться при любом размере данных из SIZES.
+BUDGETS = (
+    ('login', 'post', '/api/auth/token/login/',
+     lambda data: {'email': data['email'], 'password': 'pass12345XX'},
+     200, 6),
+    ('logout', 'post', '/api/auth/token/logout/', None, 204, 1),
+    ('tags-list', 'get', '/api/tags/', None, 200, 2),
+    ('tags-detail', 'get', '/api/tags/{tag}/', None, 200, 2),
+    ('ingredients-list', 'get', '/api/ingredients/', None, 200, 2),
+    ('ingredients-list', 'get', '/api/ingredients/?search=инг',
+     None, 200, 3),
+    ('ingredients-detail', 'get', '/api/ingredients/{ingredient}/',
+     None, 200, 2),
+    ('users-list', 'get', '/api/users/?limit=50', None, 200, 3),
+    ('users-list', 'post', '/api/users/',
+     lambda data: {'email': 'new@example.com', 'username': 'new_user',
+                   'first_name': 'Имя', 'last_name': 'Фамилия',
+                   'password': 'pass12345XX'},
+     201, 3),
+    ('users-detail', 'get', '/api/users/{author}/', None, 200, 2),
+    ('users-me', 'get', '/api/users/me/', None, 200, 1),
+    ('users-me-avatar', 'put', '/api/users/me/avatar/',
+     lambda data: {'avatar': PNG}, 200, 2),
+    ('users-me-avatar', 'delete', '/api/users/me/avatar/', None, 204, 2),
+    ('users-set-password', 'post', '/api/users/set_password/',
+     lambda data: {'current_password': 'pass12345XX',
+                   'new_password': 'new12345XXpass'},
+     204, 2),
+    ('users-activation', 'post', '/api/users/activation/',
+     lambda data: {}, 400, 0),
+    ('users-resend-activation', 'post', '/api/users/resend_activation/',
+     lambda data: {}, 400, 0),
+    ('users-reset-password', 'post', '/api/users/reset_password/',
+     lambda data: {}, 400, 0),
+    ('users-reset-password-confirm', 'post',
+     '/api/users/reset_password_confirm/', lambda data: {}, 400, 0),
+    ('users-reset-username', 'post', '/api/users/reset_email/',
+     lambda data: {}, 400, 0),
+    ('users-reset-username-confirm', 'post', '/api/users/reset_email_confirm/',
+     lambda data: {}, 400, 0),
+    ('users-set-username', 'post', '/api/users/set_email/',
+     lambda data: {}, 400, 0),
+    ('users-subscriptions', 'get', '/api/users/subscriptions/?limit=50',
+     None, 200, 3),
+    ('users-subscribe', 'post', '/api/users/{free_author}/subscribe/',
+     None, 201, 7),
+    ('users-subscribe', 'delete', '/api/users/{author}/subscribe/',
+     None, 204, 5),
+    ('recipes-list', 'get', '/api/recipes/?limit=50', None, 200, 9),
+    ('recipes-list', 'get', '/api/recipes/?limit=50&is_favorited=1',
+     None, 200, 9),
+    ('recipes-list', 'get', '/api/recipes/?limit=50&author={author}',
+     None, 200, 10),
+    ('recipes-list', 'post', '/api/recipes/', recipe_payload, 201, 19),
+    ('recipes-detail', 'get', '/api/recipes/{recipe}/', None, 200, 9),
+    ('recipes-detail', 'patch', '/api/recipes/{own}/', recipe_payload,
+     200, 19),
+    ('recipes-detail', 'delete', '/api/recipes/{own}/', None, 204, 11),
+    ('recipes-get-link', 'get', '/api/recipes/{recipe}/get-link/',
+     None, 200, 2),
+    ('recipes-shopping-list', 'get', '/api/recipes/download_shopping_cart/',
+     None, 200, 1),
+    ('recipes-add-to-favorites', 'post', '/api/recipes/{free}/favorite/',
+     None, 201, 5),
+    ('recipes-add-to-favorites', 'delete', '/api/recipes/{recipe}/favorite/',
+     None, 204, 4),
+    ('recipes-add-to-shopping-cart', 'post',
+     '/api/recipes/{free}/shopping_cart/', None, 201, 9),
+    ('recipes-add-to-shopping-cart', 'delete',
+     '/api/recipes/{recipe}/shopping_cart/', None, 204, 7),
+    ('recipes-batch-favorites', 'post', '/api/recipes/favorite/',
+     lambda data: {'recipes': data['recipes']}, 200, 4),
+    ('recipes-batch-favorites', 'delete', '/api/recipes/favorite/',
+     lambda data: {'recipes': data['recipes']}, 200, 5),
+    ('recipes-batch-shopping-cart', 'post', '/api/recipes/shopping_cart/',
+     lambda data: {'recipes': data['recipes']}, 200, 4),
+    ('recipes-batch-shopping-cart', 'delete', '/api/recipes/shopping_cart/',
+     lambda data: {'recipes': data['recipes']}, 200, 8),
+    ('uploads-list', 'post', '/api/uploads/', lambda data: {'size': 10},
+     201, 2),
+    ('uploads-detail', 'get', '/api/uploads/{upload}/', None, 200, 1),
+    ('uploads-detail', 'delete', '/api/uploads/{upload}/', None, 204, 2),
+    ('redirect-short-link', 'get', '/s/{short_link}/', None, 302, 1),
+    ('api-root', 'get', '/api/', None, 200, 0),
+)
+
+# Списки админки и бюджет запросов для них.
+ADMIN_BUDGETS = (
+    ('/admin/recipes/recipe/', 6),
+    ('/admin/users/user/', 7),
+    ('/admin/users/subscription/', 6),
+    ('/admin/recipes/favoriterecipe/', 5),
+    ('/admin/recipes/shoppingcart/', 5),
+)
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def build_data(size):
+    """
+    Создает данные, объем которых растет с size: авторов с рецептами,
+    теги, ингредиенты, подписки, избранное и корзину пользователя.
+    """
+    viewer = User.objects.create_user(
+        email='viewer@example.com', username='viewer', password='pass12345XX',
+        first_name='Имя', last_name='Фамилия', is_staff=True,
+        is_superuser=True, avatar='media/users/test.png')
+    authors = User.objects.bulk_create([
+        User(email=f'author{index}@example.com', username=f'author{index}',
+             first_name='Имя', last_name='Фамилия')
+        for index in range(size + 1)
+    ])
+    free_author = authors.pop()
+    tags = Tag.objects.bulk_create([
+        Tag(name=f'Тег {index}', slug=f'tag{index}') for index in range(size)
+    ])
+    ingredients = Ingredient.objects.bulk_create([
+        Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+        for index in range(size)
+    ])
+    recipes = Recipe.objects.bulk_create([
+        Recipe(author=author, name=f'Рецепт {index}', text='Текст',
+               cooking_time=5, image='media/recipes/test.png')
+        for index, author in enumerate(authors + [free_author, viewer])
+    ])
+    own = recipes.pop()
+    free = recipes.pop()
+    main = recipes[0]
+    TagRecipe.objects.bulk_create(
+        [TagRecipe(recipe=main, tag=tag) for tag in tags]
+        + [TagRecipe(recipe=recipe, tag=tags[0])
+           for recipe in recipes[1:] + [free]]
+    )
+    IngredientRecipeAmountModel.objects.bulk_create(
+        [IngredientRecipeAmountModel(recipe=recipe, ingredient=ingredient,
+                                     amount=1)
+         for recipe in (main, own) for ingredient in ingredients]
+        + [IngredientRecipeAmountModel(recipe=recipe,
+                                       ingredient=ingredients[0], amount=1)
+           for recipe in recipes[1:] + [free]]
+    )
+    Subscription.objects.bulk_create([
+        Subscription(user=viewer, following=author) for author in authors
+    ])
+    FavoriteRecipe.objects.bulk_create([
+        FavoriteRecipe(user=viewer, recipe=recipe) for recipe in recipes
+    ] + [
+        FavoriteRecipe(user=author, recipe=main) for author in authors
+    ])
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user=viewer, recipe=recipe) for recipe in recipes
+    ] + [
+        ShoppingCart(user=author, recipe=main) for author in authors
+    ])
+    ShoppingCartIngredient.objects.rebuild()
+    ShortLink.objects.create(recipe=main)
+    upload = ImageUpload.objects.create(user=viewer, size=10)
+    return viewer, {
+        'email': viewer.email,
+        'tag': tags[0].id,
+        'tags': [tag.id for tag in tags],
+        'ingredient': ingredients[0].id,
+        'ingredients': [ingredient.id for ingredient in ingredients],
+        'author': authors[0].id,
+        'free_author': free_author.id,
+        'recipe': main.id,
+        'recipes': [recipe.id for recipe in recipes],
+        'free': free.id,
+        'own': own.id,
+        'short_link': make_code(main.id),
+        'upload': upload.token,
+    }
+
+
+@mock.patch.object(CustomPagination, 'max_page_size', max(SIZES))
+class QueryBudgetTests(TestCase):
+    """
+    Число запросов к БД для каждого маршрута не превышает бюджета
+    и не растет с объемом данных.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media, UPLOAD_DIR=cls.media)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def reset_caches(self):
+        cache.clear()
+        local_cache.clear()
+        invalidate_ingredient_index()
+
+    def count_queries(self, size, method, path, payload, login=False):
+        """
+        Создает данные размера size, выполняет запрос и откатывает
+        изменения. Возвращает ответ и число запросов.
+        """
+        with transaction.atomic():
+            viewer, data = build_data(size)
+            client = APIClient()
+            if login:
+                client.force_login(viewer)
+            else:
+                client.force_authenticate(viewer)
+            self.reset_caches()
+            body = payload(data) if payload else None
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(
+                    path.format(**data), body, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response, len(context.captured_queries)
+
+    def assert_budget(self, method, path, payload, status, budget,
+                      login=False):
+        counts = []
+        for size in SIZES:
+            response, count = self.count_queries(
+                size, method, path, payload, login)
+            self.assertEqual(response.status_code, status,
+                             f'{size}: {getattr(response, "data", "")}')
+            self.assertLessEqual(count, budget, f'размер данных {size}')
+            counts.append(count)
+        self.assertLessEqual(
+            max(counts), counts[0],
+            f'число запросов растет с объемом данных: {counts}')
+
+    def test_every_route_has_budget(self):
+        covered = {name for name, *_ in BUDGETS}
+        missing = set(route_names(api_urls.urlpatterns)) - covered
+        self.assertFalse(missing, f'нет бюджета для маршрутов: {missing}')
+
+    def test_api_budgets(self):
+        for name, method, path, payload, status, budget in BUDGETS:
+            with self.subTest(route=name, method=method, path=path):
+                self.assert_budget(method, path, payload, status, budget)
+
+    def test_admin_changelist_budgets(self):
+        for path, budget in ADMIN_BUDGETS:
+            with self.subTest(path=path):
+                self.assert_budget('get', path, None, 200, budget,
+                                   login=True)
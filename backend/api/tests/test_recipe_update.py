@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, IngredientRecipeAmountModel, Recipe,
+                            ShoppingCart, ShoppingCartIngredient, Tag,
+                            TagRecipe)
+
+User = get_user_model()
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class RecipeUpdateTests(TestCase):
+    """
+    Обновление рецепта записывает только изменения.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+        cls.tags = Tag.objects.bulk_create([
+            Tag(name=f'Тег {index}', slug=f'tag{index}')
+            for index in range(3)
+        ])
+        cls.ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(3)
+        ])
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Каша', text='Текст', cooking_time=5,
+            image='media/recipes/test.png')
+        TagRecipe.objects.bulk_create([
+            TagRecipe(recipe=cls.recipe, tag=tag) for tag in cls.tags[:2]
+        ])
+        IngredientRecipeAmountModel.objects.bulk_create([
+            IngredientRecipeAmountModel(
+                recipe=cls.recipe, ingredient=ingredient, amount=10)
+            for ingredient in cls.ingredients[:2]
+        ])
+        ShoppingCart.objects.create(user=cls.author, recipe=cls.recipe)
+        ShoppingCartIngredient.objects.rebuild()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.path = f'/api/recipes/{self.recipe.pk}/'
+
+    def payload(self, tags=None, amounts=None):
+        amounts = amounts or {
+            ingredient.pk: 10 for ingredient in self.ingredients[:2]}
+        return {
+            'name': 'Каша', 'text': 'Текст', 'cooking_time': 5,
+            'tags': [tag.pk for tag in tags or self.tags[:2]],
+            'ingredients': [
+                {'id': pk, 'amount': amount} for pk, amount in amounts.items()
+            ],
+        }
+
+    def patch(self, payload):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.path, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(WRITES)
+        ]
+
+    def test_unchanged_patch_writes_nothing(self):
+        updated_at = Recipe.objects.get(pk=self.recipe.pk).updated_at
+        self.assertEqual(self.patch(self.payload()), [])
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).updated_at,
+                         updated_at)
+
+    def test_changed_amount(self):
+        first, second, third = self.ingredients
+        writes = self.patch(self.payload(
+            amounts={first.pk: 10, second.pk: 15, third.pk: 5}))
+        self.assertTrue(writes)
+        self.assertFalse(any('recipes_tagrecipe' in sql for sql in writes))
+        self.assertEqual(
+            dict(IngredientRecipeAmountModel.objects.filter(
+                recipe=self.recipe).values_list('ingredient_id', 'amount')),
+            {first.pk: 10, second.pk: 15, third.pk: 5})
+        self.assertEqual(
+            dict(ShoppingCartIngredient.objects.filter(
+                user=self.author).values_list('ingredient_id', 'amount')),
+            {first.pk: 10, second.pk: 15, third.pk: 5})
+
+    def test_changed_tags(self):
+        writes = self.patch(self.payload(tags=self.tags[1:]))
+        self.assertFalse(any(
+            'recipes_ingredientrecipeamountmodel' in sql for sql in writes))
+        self.assertEqual(
+            set(TagRecipe.objects.filter(
+                recipe=self.recipe).values_list('tag_id', flat=True)),
+            {tag.pk for tag in self.tags[1:]})
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (FavoriteRecipe, Ingredient,
+                            IngredientRecipeAmountModel, Recipe,
+                            ShoppingCart, ShoppingCartIngredient)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class ShoppingCartTotalsTests(TestCase):
+    """
+    Суммы ингредиентов в списках покупок.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = User.objects.bulk_create([
+            User(email=f'user{index}@example.com', username=f'user{index}',
+                 first_name='Имя', last_name='Фамилия')
+            for index in range(2)
+        ])
+        cls.salt, cls.flour = Ingredient.objects.bulk_create([
+            Ingredient(name='соль', measurement_unit='г'),
+            Ingredient(name='мука', measurement_unit='г'),
+        ])
+        cls.bread, cls.pie = Recipe.objects.bulk_create([
+            Recipe(author=cls.first, name=name, text='Текст',
+                   cooking_time=5, image='media/recipes/test.png')
+            for name in ('Хлеб', 'Пирог')
+        ])
+        IngredientRecipeAmountModel.objects.bulk_create([
+            IngredientRecipeAmountModel(recipe=cls.bread,
+                                        ingredient=cls.salt, amount=5),
+            IngredientRecipeAmountModel(recipe=cls.bread,
+                                        ingredient=cls.flour, amount=300),
+            IngredientRecipeAmountModel(recipe=cls.pie,
+                                        ingredient=cls.flour, amount=200),
+        ])
+
+    def totals(self, user):
+        return dict(ShoppingCartIngredient.objects.filter(
+            user=user).values_list('ingredient_id', 'amount'))
+
+    def fill_carts(self):
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=self.first, recipe=self.bread),
+            ShoppingCart(user=self.first, recipe=self.pie),
+            ShoppingCart(user=self.second, recipe=self.bread),
+        ])
+
+    def test_rebuild_all(self):
+        self.fill_carts()
+        ShoppingCartIngredient.objects.rebuild()
+        self.assertEqual(self.totals(self.first),
+                         {self.salt.pk: 5, self.flour.pk: 500})
+        self.assertEqual(self.totals(self.second),
+                         {self.salt.pk: 5, self.flour.pk: 300})
+
+    def test_rebuild_users_with_shared_recipe(self):
+        self.fill_carts()
+        ShoppingCartIngredient.objects.rebuild(user_ids=[self.first.pk])
+        self.assertEqual(self.totals(self.first),
+                         {self.salt.pk: 5, self.flour.pk: 500})
+        self.assertEqual(self.totals(self.second), {})
+
+    def test_apply_removes_empty_rows(self):
+        manager = ShoppingCartIngredient.objects
+        manager.apply([self.first.pk], {self.salt.pk: 5, self.flour.pk: 2})
+        manager.apply([self.first.pk], {self.salt.pk: -5, self.flour.pk: 1})
+        self.assertEqual(self.totals(self.first), {self.flour.pk: 3})
+
+    def test_recipe_change_updates_carts(self):
+        self.fill_carts()
+        ShoppingCartIngredient.objects.rebuild()
+        old_amounts = ShoppingCartIngredient.objects.recipe_amounts(
+            self.bread.pk)
+        IngredientRecipeAmountModel.objects.filter(
+            recipe=self.bread, ingredient=self.salt).delete()
+        ShoppingCartIngredient.objects.apply_recipe_change(
+            self.bread.pk, old_amounts)
+        self.assertEqual(self.totals(self.first), {self.flour.pk: 500})
+        self.assertEqual(self.totals(self.second), {self.flour.pk: 300})
+
+    def test_add_and_remove_through_api(self):
+        client = APIClient()
+        client.force_authenticate(self.second)
+        path = f'/api/recipes/{self.pie.pk}/shopping_cart/'
+        self.assertEqual(client.post(path).status_code, 201)
+        self.assertEqual(self.totals(self.second), {self.flour.pk: 200})
+        self.assertEqual(client.delete(path).status_code, 204)
+        self.assertEqual(self.totals(self.second), {})
+
+    def test_recipe_deleted(self):
+        self.fill_carts()
+        ShoppingCartIngredient.objects.rebuild()
+        self.bread.delete()
+        self.assertEqual(self.totals(self.first), {self.flour.pk: 200})
+        self.assertEqual(self.totals(self.second), {})
+
+    def test_recipe_delete_queries_do_not_grow_with_carts(self):
+        counts = []
+        for size in (2, 20):
+            users = User.objects.bulk_create([
+                User(email=f'{size}_{index}@example.com',
+                     username=f'{size}_{index}',
+                     first_name='Имя', last_name='Фамилия')
+                for index in range(size)
+            ])
+            recipe = Recipe.objects.create(
+                author=self.first, name='Суп', text='Текст',
+                cooking_time=5, image='media/recipes/test.png')
+            IngredientRecipeAmountModel.objects.create(
+                recipe=recipe, ingredient=self.salt, amount=1)
+            for user in users:
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+                FavoriteRecipe.objects.create(user=user, recipe=recipe)
+            with CaptureQueriesContext(connection) as context:
+                recipe.delete()
+            counts.append(len(context.captured_queries))
+            self.assertFalse(ShoppingCartIngredient.objects.filter(
+                user__in=users).exists())
+        self.assertEqual(counts[0], counts[1])
+
+    def test_user_deleted(self):
+        for user in (self.first, self.second):
+            ShoppingCart.objects.create(user=user, recipe=self.bread)
+        FavoriteRecipe.objects.create(user=self.second, recipe=self.pie)
+        Subscription.objects.create(user=self.second, following=self.first)
+        self.second.delete()
+        self.bread.refresh_from_db()
+        self.pie.refresh_from_db()
+        self.first.refresh_from_db()
+        self.assertEqual(self.bread.shopping_cart_count, 1)
+        self.assertEqual(self.pie.favorites_count, 0)
+        self.assertEqual(self.first.subscribers_count, 0)
+        self.assertEqual(self.totals(self.first),
+                         {self.salt.pk: 5, self.flour.pk: 300})
+
+    def test_author_deleted(self):
+        self.fill_carts()
+        ShoppingCartIngredient.objects.rebuild()
+        self.first.delete()
+        self.assertEqual(self.totals(self.second), {})
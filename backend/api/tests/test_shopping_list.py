@@ -0,0 +1,85 @@
+import csv
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.constans import CSV_HEADERS
+from recipes.models import (Ingredient, IngredientRecipeAmountModel, Recipe,
+                            ShoppingCart)
+
+User = get_user_model()
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListFormatTests(TestCase):
+    """
+    Выбор формата файла со списком покупок.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='user@example.com', username='user',
+            first_name='Имя', last_name='Фамилия')
+        salt, flour = Ingredient.objects.bulk_create([
+            Ingredient(name='соль', measurement_unit='г'),
+            Ingredient(name='мука', measurement_unit='г'),
+        ])
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Хлеб', text='Текст', cooking_time=5,
+            image='media/recipes/test.png')
+        IngredientRecipeAmountModel.objects.bulk_create([
+            IngredientRecipeAmountModel(recipe=recipe, ingredient=salt,
+                                        amount=5),
+            IngredientRecipeAmountModel(recipe=recipe, ingredient=flour,
+                                        amount=300),
+        ])
+        ShoppingCart.objects.add_recipes(cls.user.pk, [recipe.pk])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, params=None, **headers):
+        response = self.client.get(URL, params, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode()
+        return response, content
+
+    def test_txt_by_default(self):
+        response, content = self.download()
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('filename="shopping_cart.txt"',
+                      response['Content-Disposition'])
+        self.assertEqual(
+            content, 'Список покупок:\nмука - 300 г\nсоль - 5 г\n')
+
+    def test_csv(self):
+        for response, content in (self.download({'format': 'csv'}),
+                                  self.download(Accept='text/csv')):
+            self.assertEqual(response['Content-Type'],
+                             'text/csv; charset=utf-8')
+            self.assertIn('filename="shopping_cart.csv"',
+                          response['Content-Disposition'])
+            self.assertEqual(list(csv.reader(StringIO(content))), [
+                CSV_HEADERS, ['мука', '300', 'г'], ['соль', '5', 'г']])
+
+    def test_json(self):
+        response, content = self.download({'format': 'json'})
+        self.assertEqual(response['Content-Type'],
+                         'application/json; charset=utf-8')
+        self.assertEqual(content, (
+            '[{"name": "мука", "amount": 300, "measurement_unit": "г"}, '
+            '{"name": "соль", "amount": 5, "measurement_unit": "г"}]\n'))
+
+    def test_unknown_format(self):
+        self.assertEqual(
+            self.client.get(URL, {'format': 'xml'}).status_code, 404)
+        self.assertEqual(
+            self.client.get(URL, headers={'Accept': 'application/xml'})
+            .status_code, 406)
+
+    def test_anonymous(self):
+        self.assertEqual(APIClient().get(URL).status_code, 401)
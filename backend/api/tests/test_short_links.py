@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.constans import SHORT_LINK_LOCAL_TTL
+from recipes.models import Recipe, ShortLink
+from recipes.short_links import LRUCache, local_cache, make_code
+
+User = get_user_model()
+
+
+class ShortLinkRedirectTests(TestCase):
+    """
+    Редирект по короткой ссылке.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия')
+        cls.stored, cls.computed = Recipe.objects.bulk_create([
+            Recipe(author=author, name=name, text='Текст', cooking_time=5,
+                   image='media/recipes/test.png')
+            for name in ('Каша', 'Суп')
+        ])
+        ShortLink.objects.create(recipe=cls.stored)
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+
+    def assert_redirects_to(self, code, recipe):
+        response = self.client.get(f'/s/{code}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f'/recipes/{recipe.pk}/')
+
+    def test_stored_link(self):
+        link = ShortLink.objects.get(recipe=self.stored).link
+        self.assert_redirects_to(link, self.stored)
+        self.assert_redirects_to(link, self.stored)
+
+    def test_computed_link(self):
+        self.assert_redirects_to(make_code(self.computed.pk), self.computed)
+
+    def get_link(self, recipe):
+        response = self.client.get(f'/api/recipes/{recipe.pk}/get-link/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['short-link'].rsplit('/', 1)[1]
+
+    def test_issued_link_stored(self):
+        code = self.get_link(self.computed)
+        self.assertEqual(code, make_code(self.computed.pk))
+        self.assertEqual(ShortLink.objects.get(link=code).recipe_id,
+                         self.computed.pk)
+        self.assertEqual(self.get_link(self.computed), code)
+
+    def test_legacy_link(self):
+        ShortLink.objects.filter(recipe=self.stored).update(link='3fa85f')
+        self.assertEqual(self.get_link(self.stored), '3fa85f')
+        self.assert_redirects_to('3fa85f', self.stored)
+
+    def test_legacy_link_taken_code(self):
+        taken = make_code(self.computed.pk)
+        ShortLink.objects.filter(recipe=self.stored).update(link=taken)
+        code = self.get_link(self.computed)
+        self.assertNotEqual(code, taken)
+        self.assert_redirects_to(code, self.computed)
+        self.assert_redirects_to(taken, self.stored)
+
+    def test_unknown_link(self):
+        self.assertEqual(self.client.get('/s/unknown/').status_code, 404)
+
+    def test_deleted_recipe(self):
+        link = ShortLink.objects.get(recipe=self.stored).link
+        self.assert_redirects_to(link, self.stored)
+        self.stored.delete()
+        self.assertEqual(self.client.get(f'/s/{link}/').status_code, 404)
+
+
+class LRUCacheTests(TestCase):
+    """
+    Кеш коротких ссылок процесса.
+    """
+    def test_entries_expire(self):
+        lru = LRUCache(10, SHORT_LINK_LOCAL_TTL)
+        with mock.patch('recipes.short_links.monotonic', return_value=100):
+            lru.set('code', 1)
+            self.assertEqual(lru.get('code'), 1)
+        with mock.patch('recipes.short_links.monotonic',
+                        return_value=100 + SHORT_LINK_LOCAL_TTL):
+            self.assertIsNone(lru.get('code'))
+
+    def test_least_recently_used_evicted(self):
+        lru = LRUCache(2, SHORT_LINK_LOCAL_TTL)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
@@ -0,0 +1,141 @@
+import base64
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.uploads import write_chunks
+from users.models import ImageUpload
+
+User = get_user_model()
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S'
+    '0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJ'
+    'RU5ErkJggg=='
+)
+
+
+class ChunkedUploadTests(TestCase):
+    """
+    Загрузка изображения по частям.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media, UPLOAD_DIR=os.path.join(cls.media, 'up'))
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='pass',
+            first_name='Имя', last_name='Фамилия')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, size=len(PNG)):
+        response = self.client.post('/api/uploads/', {'size': size},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['token']
+
+    def send(self, token, chunk, offset):
+        return self.client.generic(
+            'PATCH', f'/api/uploads/{token}/', chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset))
+
+    def assertNoParts(self):
+        self.assertFalse([
+            name for name in os.listdir(os.path.join(self.media, 'up'))
+            if name.endswith('.part')
+        ])
+
+    def test_chunks_with_offsets(self):
+        token = self.create()
+        middle = len(PNG) // 2
+        response = self.send(token, PNG[:middle], 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['received'], middle)
+        self.assertFalse(response.json()['complete'])
+        response = self.send(token, PNG[middle:], middle)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['complete'])
+        with open(ImageUpload.objects.get(token=token).path, 'rb') as file:
+            self.assertEqual(file.read(), PNG)
+        self.assertNoParts()
+
+    def test_wrong_offset_conflict(self):
+        token = self.create()
+        self.send(token, PNG[:10], 0)
+        for offset in (0, 5, 20, ''):
+            response = self.send(token, PNG[10:], offset)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['received'], 10)
+        self.assertEqual(ImageUpload.objects.get(token=token).received, 10)
+
+    def test_concurrent_chunk_conflict(self):
+        token = self.create()
+        self.send(token, PNG[:10], 0)
+
+        def competing_write(*args, **kwargs):
+            """
+            Параллельный запрос с тем же смещением успевает раньше.
+            """
+            with open(ImageUpload.objects.get(token=token).path,
+                      'ab') as file:
+                file.write(PNG[10:20])
+            ImageUpload.objects.filter(token=token).update(received=20)
+            return write_chunks(*args, **kwargs)
+
+        with mock.patch('api.views.write_chunks', competing_write):
+            response = self.send(token, b'x' * 10, 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 20)
+        response = self.send(token, PNG[20:], 20)
+        self.assertTrue(response.json()['complete'])
+        with open(ImageUpload.objects.get(token=token).path, 'rb') as file:
+            self.assertEqual(file.read(), PNG)
+        self.assertNoParts()
+
+    def test_chunk_over_size_rejected(self):
+        token = self.create(size=10)
+        response = self.send(token, PNG[:11], 0)
+        self.assertEqual(response.status_code, 400)
+        upload = ImageUpload.objects.get(token=token)
+        self.assertEqual(upload.received, 0)
+        self.assertEqual(os.path.getsize(upload.path), 0)
+
+    def test_complete_upload_used_once(self):
+        token = self.create()
+        self.send(token, PNG, 0)
+        path = ImageUpload.objects.get(token=token).path
+        response = self.client.put('/api/users/me/avatar/',
+                                   {'avatar': token}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(os.path.exists(path))
+        self.user.refresh_from_db()
+        with self.user.avatar.open('rb') as avatar:
+            self.assertEqual(avatar.read(), PNG)
+        response = self.client.put('/api/users/me/avatar/',
+                                   {'avatar': token}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_incomplete_upload_rejected(self):
+        token = self.create()
+        self.send(token, PNG[:10], 0)
+        response = self.client.put('/api/users/me/avatar/',
+                                   {'avatar': token}, format='json')
+        self.assertEqual(response.status_code, 400)
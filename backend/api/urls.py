@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import redirect_short_link
-from api.views import (UserViewSet, TagViewSet,
+from api.views import (UserViewSet, TagViewSet, ImageUploadViewSet,
                        RecipeViewSet, IngredientViewSet)
 
 router_v1 = DefaultRouter()
@@ -11,6 +11,7 @@ router_v1.register(r'tags', TagViewSet, basename='tags')
 router_v1.register(r'users', UserViewSet, basename='users')
 router_v1.register(r'recipes', RecipeViewSet, basename='recipes')
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
+router_v1.register(r'uploads', ImageUploadViewSet, basename='uploads')
 
 urlpatterns = [
     path('api/auth/', include('djoser.urls.authtoken')),
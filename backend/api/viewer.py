@@ -0,0 +1,58 @@
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import cached_property
+
+from recipes.models import FavoriteRecipe, ShoppingCart
+from users.models import Subscription
+
+
+class ViewerState:
+    """
+    Списки текущего пользователя: подписки, избранное и покупки.
+    Каждый список загружается одним запросом при первом обращении
+    и живет до конца запроса.
+    """
+    def __init__(self, user):
+        self.user = user
+
+    def _ids(self, queryset, field):
+        """
+        Множество идентификаторов из связей пользователя.
+        """
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(
+            queryset.filter(user=self.user).values_list(field, flat=True))
+
+    @cached_property
+    def following_ids(self):
+        return self._ids(Subscription.objects, 'following_id')
+
+    @cached_property
+    def favorite_ids(self):
+        return self._ids(FavoriteRecipe.objects, 'recipe_id')
+
+    @cached_property
+    def shopping_cart_ids(self):
+        return self._ids(ShoppingCart.objects, 'recipe_id')
+
+    def is_subscribed(self, author):
+        return author.pk in self.following_ids
+
+    def is_favorited(self, recipe):
+        return recipe.pk in self.favorite_ids
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.pk in self.shopping_cart_ids
+
+
+def get_viewer_state(request):
+    """
+    Возвращает состояние пользователя, привязанное к запросу.
+    """
+    if request is None:
+        return ViewerState(AnonymousUser())
+    state = getattr(request, '_viewer_state', None)
+    if state is None or state.user != request.user:
+        state = ViewerState(request.user)
+        request._viewer_state = state
+    return state
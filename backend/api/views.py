@@ -1,36 +1,54 @@
 import os
-from uuid import uuid4
-from io import BytesIO
 
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404, redirect
-from django.http import FileResponse
+from django.http import Http404, StreamingHttpResponse
 from django.core.files.storage import default_storage
 from django.contrib.auth import get_user_model
-from django.db.models import OuterRef, Sum, Exists, Value, BooleanField
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from djoser.views import UserViewSet as DjoserViewSet
 from djoser.permissions import CurrentUserOrAdminOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
+from api.etags import (tags_etag, ingredients_etag,
+                       recipe_etag, recipe_last_modified)
 from api.filters import RecipeFilter, IngredientFilter
 from api.pagination import CustomPagination
+from api.renderers import SHOPPING_LIST_RENDERERS
+from api.shopping_list import EXPORTERS
 from api.permissions import AuthorOrReadOnly
 from recipes.models import (Tag, Recipe, Ingredient, ShortLink,
                             ShoppingCart, FavoriteRecipe,
-                            IngredientRecipeAmountModel)
+                            ShoppingCartIngredient)
 from api.serializers import (UserAvatarUpdateSerializer, TagSerializer,
+                             ImageUploadSerializer,
                              RecipeCreateSerializer, IngredientSerializer,
                              RecipeGETSerializer,
                              ShortLinkSerializer, ShoppingCartSerializer,
                              SubscriptionSerializer, FavoriteRecipeSerializer,
-                             ListSubscriptionsSerializer,)
-from core.constans import SHORT_LINK_LENGTH
+                             ListSubscriptionsSerializer,
+                             RecipeBatchSerializer,)
+from recipes.ingredient_index import get_ingredient_index
+from users.models import ImageUpload, Subscription
+from core.uploads import (copy_at, part_path, read_stream, remove_file,
+                          write_chunks)
+from recipes.short_links import resolve_short_link
+from core.constans import (SHORT_LINK_CACHE_TIMEOUT, ITERATOR_CHUNK_SIZE,
+                           INGREDIENT_SEARCH_LIMIT, UPLOAD_CHUNK_SIZE)
 
 User = get_user_model()
 
+NON_FIELD_ERRORS_KEY = api_settings.NON_FIELD_ERRORS_KEY
+
 
 class UserViewSet(DjoserViewSet):
     """
@@ -91,34 +109,36 @@ class UserViewSet(DjoserViewSet):
         """
         following = get_object_or_404(User, pk=pk)
         user = request.user
-        data = {'following': following.id, 'user': user.id}
 
         if request.method == 'POST':
+            if user.id == following.id:
+                raise ValidationError(
+                    {NON_FIELD_ERRORS_KEY: ['Нельзя подписаться на себя.']})
+            if not Subscription.objects.subscribe(user.id, following.id):
+                raise ValidationError(
+                    {NON_FIELD_ERRORS_KEY: ['Подписка уже есть.']})
             serializer = SubscriptionSerializer(
-                data=data,
+                Subscription(user=user, following=following),
                 context={'request': request}
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == 'DELETE':
-            queryset = user.subscriptions.filter(following=following)
-            if queryset.exists():
-                queryset.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(
-                {'detail': 'Подписка не найдена.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if Subscription.objects.unsubscribe(user.id, following.id):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            {'detail': 'Подписка не найдена.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
     @action(detail=False, methods=['get'], url_path='subscriptions')
     def subscriptions(self, request):
         """
         Получение списка подписчиков.
         """
-        user = request.user
-        subscriptions = User.objects.filter(followers__user=user)
+        subscriptions = ListSubscriptionsSerializer.setup_eager_loading(
+            User.objects.filter(followers__user=request.user).order_by('-id'),
+            request
+        )
         paginated_subscriptions = self.paginate_queryset(subscriptions)
         serializer = ListSubscriptionsSerializer(
             paginated_subscriptions, many=True, context={'request': request}
@@ -126,6 +146,72 @@ class UserViewSet(DjoserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
+class ImageUploadViewSet(mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Загрузка изображений файлом или по частям.
+    POST с полем file в multipart сразу создает завершенную загрузку,
+    POST с полем size создает пустую, которая дополняется PATCH-запросами
+    с частями файла в теле и заголовком Upload-Offset.
+    Токен загрузки передается в поле image или avatar вместо base64.
+    """
+    serializer_class = ImageUploadSerializer
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        """
+        Создание загрузки.
+        """
+        uploaded = request.FILES.get('file')
+        data = request.data if uploaded is None else {'size': uploaded.size}
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(user=request.user)
+        chunks = uploaded.chunks(UPLOAD_CHUNK_SIZE) if uploaded else ()
+        upload.received = write_chunks(
+            upload.path, chunks, upload.size, mode='wb')
+        upload.save(update_fields=('received',))
+        return Response(self.get_serializer(upload).data,
+                        status=status.HTTP_201_CREATED)
+
+    def partial_update(self, request, pk=None):
+        """
+        Дописывание части файла.
+        Заголовок Upload-Offset должен совпадать с уже полученным
+        количеством байт, иначе возвращается 409 с текущим состоянием.
+        Тело читается во временный файл без транзакции и блокировок,
+        затем смещение сдвигается условным UPDATE: из параллельных
+        запросов с одним смещением часть принимает только один.
+        """
+        upload = self.get_object()
+        offset = upload.received
+        if request.headers.get('Upload-Offset') != str(offset):
+            return Response(self.get_serializer(upload).data,
+                            status=status.HTTP_409_CONFLICT)
+        part = part_path(upload.path)
+        try:
+            written = write_chunks(part, read_stream(request.stream),
+                                   upload.size - offset, mode='wb')
+            if not self.get_queryset().filter(
+                pk=upload.pk, received=offset
+            ).update(received=offset + written):
+                upload.refresh_from_db(fields=('received',))
+                return Response(self.get_serializer(upload).data,
+                                status=status.HTTP_409_CONFLICT)
+            copy_at(part, upload.path, offset)
+        finally:
+            remove_file(part)
+        upload.received = offset + written
+        return Response(self.get_serializer(upload).data)
+
+
+@method_decorator(condition(etag_func=tags_etag), name='list')
+@method_decorator(condition(etag_func=tags_etag), name='retrieve')
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет тегов.
@@ -137,6 +223,8 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'id'
 
 
+@method_decorator(condition(etag_func=ingredients_etag), name='list')
+@method_decorator(condition(etag_func=ingredients_etag), name='retrieve')
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет ингредиентов.
@@ -148,7 +236,38 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filterset_fields = ['name']
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список и автодополнение ингредиентов из индекса в памяти процесса.
+        Параметр limit ограничивает число подсказок.
+        Параметр search включает нечеткий поиск в базе данных.
+        """
+        if request.query_params.get('search'):
+            queryset = self.filter_queryset(self.get_queryset())
+            serializer = self.get_serializer(
+                queryset[:INGREDIENT_SEARCH_LIMIT], many=True)
+            return Response(serializer.data)
+        return Response(self.search_index(
+            get_ingredient_index(ingredients_etag(request)),
+            request.query_params))
+
+    @staticmethod
+    def search_index(index, params):
+        """
+        Ингредиенты из индекса по параметрам name и limit.
+        """
+        name = params.get('name')
+        if not name:
+            return index.rows
+        limit = params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else None
+        return index.search(name, limit)
 
+
+@method_decorator(
+    condition(etag_func=recipe_etag, last_modified_func=recipe_last_modified),
+    name='retrieve'
+)
 class RecipeViewSet(viewsets.ModelViewSet):
     """
     Вьюсет для создания и получения рецептов.
@@ -161,31 +280,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Получение рецептов в зависимости от избранного или списка покупок.
+        Получение рецептов. Фильтрация по избранному и списку покупок
+        выполняется в RecipeFilter.
+        Для чтения загружаются только ключи кеша: остальное
+        RecipeGETSerializer берет из кеша или догружает сам.
         """
         queryset = Recipe.objects.all().order_by('-id')
-        if self.request.user.is_authenticated:
-            favorite_subquery = FavoriteRecipe.objects.filter(
-                user=self.request.user,
-                recipe=OuterRef('pk')
-            ).values('recipe')
-            shopping_cart_subquery = ShoppingCart.objects.filter(
-                user=self.request.user,
-                recipe=OuterRef('pk')
-            ).values('recipe')
-            queryset = queryset.annotate(
-                is_favorited=Exists(favorite_subquery),
-                is_in_shopping_cart=Exists(shopping_cart_subquery)
-            )
-            if self.request.query_params.get('is_in_shopping_cart'):
-                queryset = queryset.filter(is_in_shopping_cart=True)
-            if self.request.query_params.get('is_favorited'):
-                queryset = queryset.filter(is_favorited=True)
-        if self.request.user.is_anonymous:
-            queryset = queryset.annotate(
-                is_favorited=Value(False, output_field=BooleanField()),
-                is_in_shopping_cart=Value(False, output_field=BooleanField())
-            )
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only('id', 'author_id', 'updated_at')
+        elif self.action == 'get_link':
+            queryset = queryset.only('id')
         return queryset
 
     def get_serializer_class(self):
@@ -196,15 +300,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeGETSerializer
         return RecipeCreateSerializer
 
-    def _get_or_create_short_link(self, recipe):
+    def _get_short_link(self, recipe):
         """
-        Создание или получение ссылки из БД.
+        Получение ссылки из БД.
+        Ссылка создается при первой выдаче, чтобы выданный код
+        не зависел от будущих изменений алгоритма.
         """
-        short_link_obj, created = ShortLink.objects.get_or_create(
-            recipe=recipe)
-        if created:
-            short_link_obj.link = str(uuid4())[:SHORT_LINK_LENGTH]
-            short_link_obj.save()
+        short_link_obj, _ = ShortLink.objects.get_or_create(recipe=recipe)
         serializer = ShortLinkSerializer(short_link_obj)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -218,42 +320,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Получение ссылки.
         """
         recipe = self.get_object()
-        return self._get_or_create_short_link(recipe)
+        return self._get_short_link(recipe)
 
     @action(detail=False,
             methods=['get'],
             url_path='download_shopping_cart',
-            permission_classes=[IsAuthenticated]
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS
             )
     def shopping_list(self, request):
         """
         Скачать файл со списком покупок.
+        Формат задается параметром format: txt (по умолчанию), csv или json.
         """
-        ingredients = IngredientRecipeAmountModel.objects.filter(
-            recipe__in=Recipe.objects.filter(
-                shoppingcart__user=self.request.user
-            )
-        ).values(
+        rows = ShoppingCartIngredient.objects.filter(
+            user=request.user
+        ).order_by('ingredient__name').values_list(
             'ingredient__name',
+            'amount',
             'ingredient__measurement_unit'
-        ).annotate(
-            total_quantity=Sum('amount')
+        ).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        file_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            EXPORTERS[file_format](rows),
+            content_type=(f'{request.accepted_renderer.media_type}; '
+                          'charset=utf-8'),
+            status=status.HTTP_200_OK
         )
-
-        file_content = "Список покупок:\n"
-        if ingredients.exists():
-            for item in ingredients:
-                file_content += (f"{item['ingredient__name']} - "
-                                 f"{item['total_quantity']} "
-                                 f"{item['ingredient__measurement_unit']}\n")
-        else:
-            file_content += "Ваш список покупок пуст.\n"
-
-        file_buffer = BytesIO(file_content.encode('utf-8'))
-        return FileResponse(file_buffer,
-                            as_attachment=True,
-                            filename='shopping_cart.txt',
-                            status=status.HTTP_200_OK)
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{file_format}"')
+        return response
 
     def _add_or_delete_to_model(
             self, request, serializer_class, model, pk=None
@@ -261,22 +357,96 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Добавить или удалить рецепт в модель.
         """
-        recipe = get_object_or_404(Recipe, pk=pk)
         user = request.user
-        data = {'user': user.id, 'recipe': recipe.id}
+        if not str(pk).isdigit():
+            raise Http404
 
         if request.method == 'POST':
-            serializer = serializer_class(
-                data=data, context={'request': request})
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            recipe = get_object_or_404(
+                Recipe.objects.only('id', 'name', 'image', 'cooking_time'),
+                pk=pk)
+            if not model.objects.add_recipes(user.id, [recipe.id]):
+                raise ValidationError({NON_FIELD_ERRORS_KEY: [
+                    'Рецепт уже добавлен в этот список.']})
+            serializer = serializer_class(model(user=user, recipe=recipe))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == 'DELETE':
-            instance = model.objects.filter(user=user, recipe=recipe).first()
-            if instance:
-                instance.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
+        if model.objects.remove_recipes(user.id, [pk]):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=pk)
+        raise ValidationError(
+            {NON_FIELD_ERRORS_KEY: ['Рецепт не найден в этом списке.']})
+
+    @staticmethod
+    def _batch_add(model, user_id, recipe_ids, found):
+        """
+        Добавить найденные рецепты одной вставкой в своей транзакции.
+        Если рецепт удален после проверки, вставка повторяется
+        по одному рецепту, а удаленные убираются из найденных.
+        """
+        try:
+            return set(model.objects.add_recipes(
+                user_id, [pk for pk in recipe_ids if pk in found]))
+        except IntegrityError:
+            pass
+        changed = set()
+        for pk in [pk for pk in recipe_ids if pk in found]:
+            try:
+                changed.update(model.objects.add_recipes(user_id, [pk]))
+            except IntegrityError:
+                found.discard(pk)
+        return changed
+
+    def _batch_to_model(self, request, model):
+        """
+        Пакетно добавить или удалить рецепты в модель.
+        Существование рецептов проверяется одним запросом,
+        запись выполняется одной вставкой или одним удалением.
+        """
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        found = set(Recipe.objects.filter(
+            pk__in=recipe_ids).values_list('id', flat=True))
+        if request.method == 'POST':
+            changed = self._batch_add(model, request.user.id, recipe_ids,
+                                      found)
+            statuses = ('added', 'already_added')
+        else:
+            changed = set(model.objects.remove_recipes(
+                request.user.id, [pk for pk in recipe_ids if pk in found]))
+            statuses = ('removed', 'not_in_list')
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    'not_found' if pk not in found
+                    else statuses[0] if pk in changed
+                    else statuses[1]
+                )
+            }
+            for pk in recipe_ids
+        ]}, status=status.HTTP_200_OK)
+
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='favorite',
+            permission_classes=[IsAuthenticated])
+    def batch_favorites(self, request):
+        """
+        Пакетно добавляет или удаляет рецепты из избранного.
+        """
+        return self._batch_to_model(request, FavoriteRecipe)
+
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='shopping_cart',
+            permission_classes=[IsAuthenticated])
+    def batch_shopping_cart(self, request):
+        """
+        Пакетно добавляет или удаляет рецепты из списка покупок.
+        """
+        return self._batch_to_model(request, ShoppingCart)
 
     @action(detail=True,
             methods=['post', 'delete'],
@@ -307,5 +477,10 @@ def redirect_short_link(request, short_link):
     """
     Редирект на соответствующий рецепт по короткой ссылке.
     """
-    short_link_obj = get_object_or_404(ShortLink, link=short_link)
-    return redirect(f"/recipes/{short_link_obj.recipe.pk}/")
+    recipe_id = resolve_short_link(short_link)
+    if recipe_id is None:
+        raise Http404
+    response = redirect(f"/recipes/{recipe_id}/")
+    patch_cache_control(
+        response, public=True, max_age=SHORT_LINK_CACHE_TIMEOUT)
+    return response
@@ -5,13 +5,43 @@ MAX_INGREDIENT: int = 128
 MAX_UNIT: int = 64
 RECIPE_MAX_FIELDS: int = 256
 DESC_MAX_FIELD: int = 800
-SHORT_LINK_LENGTH: int = 3
+SHORT_LINK_LENGTH: int = 6
+SHORT_LINK_MAX_LENGTH: int = 16
+SHORT_LINK_MULTIPLIER: int = 1580030173
+SHORT_LINK_CACHE_SIZE: int = 10000
+SHORT_LINK_CACHE_TIMEOUT: int = 86400
+SHORT_LINK_LOCAL_TTL: int = 60
+CATALOG_VERSION_MAX_LENGTH: int = 64
 PAGE_SIZE: int = 6
+RECIPE_BATCH_SIZE: int = 100
 CSV_HEADERS: list = ['Ингредиент', 'Количество', 'Единица измерения']
 FILE_BEGIN: int = 0
+ITERATOR_CHUNK_SIZE: int = 2000
+INGREDIENT_INDEX_TTL: int = 300
+INGREDIENT_SEARCH_LIMIT: int = 20
+SIMILARITY_CUTOFF: float = 0.6
+RECIPE_CACHE_TIMEOUT: int = 3600
+IMAGE_WORKERS: int = 2
+IMAGE_QUEUE_SIZE: int = 8
+IMAGE_TIMEOUT: int = 30
+IMAGE_MAX_PIXELS: int = 40_000_000
+IMAGE_QUALITY: int = 85
+RECIPE_RENDITIONS: dict = {'thumbnail': (320, 320), 'detail': (960, 960)}
+AVATAR_RENDITIONS: dict = {'avatar': (128, 128)}
+RENDITION_FORMATS: dict = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+MIN_UPLOAD_SIZE: int = 1
+UPLOAD_MAX_SIZE: int = 20 * 1024 * 1024
+UPLOAD_CHUNK_SIZE: int = 64 * 1024
+UPLOAD_TTL: int = 86400
+IMPORT_BATCH_SIZE: int = 5000
+IMPORT_READ_SIZE: int = 64 * 1024
+SEED_BATCH_SIZE: int = 1000
+MAX_SMALLINT: int = 32767
+METRICS_BUCKETS: tuple = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEED_PLACEHOLDER: str = 'media/recipes/seed_placeholder.png'
 MIN_COOKING_TIME: int = 0
 MIN_AMOUNT: int = 1
 EMPTY_VALUES: list = (None, "", [], (), {})
 MIN_LIMIT: int = 0
-MIN_COUNT: int = 20
 FIELD_TO_EDIT: int = 1
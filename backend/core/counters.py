@@ -0,0 +1,41 @@
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def shift_counter(model, pks, field, delta=1):
+    """
+    Атомарно изменяет счетчик у объектов с указанными ключами.
+    Значение не опускается ниже нуля.
+    """
+    if not pks:
+        return
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))})
+
+
+def is_cascade(sender, origin):
+    """
+    Объект sender удаляется каскадом от объекта другой модели.
+    Такие удаления учитываются один раз в обработчике удаления
+    исходного объекта, а не построчно.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return not issubclass(model, sender)
+
+
+def recount(model, field, related_model, fk_name):
+    """
+    Пересчитывает счетчик по связанной таблице.
+    Возвращает количество исправленных строк.
+    """
+    actual = Coalesce(
+        Subquery(
+            related_model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+    return model.objects.exclude(**{field: actual}).update(**{field: actual})
@@ -0,0 +1,168 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from io import BytesIO
+from threading import BoundedSemaphore
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.constans import (IMAGE_MAX_PIXELS, IMAGE_QUALITY, IMAGE_QUEUE_SIZE,
+                           IMAGE_TIMEOUT, IMAGE_WORKERS, RENDITION_FORMATS)
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_WORKERS, thread_name_prefix='images')
+slots = BoundedSemaphore(IMAGE_QUEUE_SIZE)
+
+
+class ImagePoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер обрабатывает слишком много изображений.'
+    default_code = 'image_pool_busy'
+
+
+def run_in_pool(func, *args):
+    """
+    Выполняет обработку изображения в ограниченном пуле потоков.
+    Одновременно в пуле и в очереди к нему не больше
+    IMAGE_QUEUE_SIZE задач, лишние запросы получают 503.
+    Место освобождается по завершении задачи, а не по истечении
+    ожидания, иначе зависшие задачи не учитывались бы в лимите.
+    """
+    if not slots.acquire(timeout=IMAGE_TIMEOUT):
+        raise ImagePoolBusy
+    try:
+        future = executor.submit(func, *args)
+    except RuntimeError:
+        slots.release()
+        raise
+    future.add_done_callback(lambda future: slots.release())
+    try:
+        return future.result(timeout=IMAGE_TIMEOUT)
+    except TimeoutError:
+        raise ImagePoolBusy
+
+
+def check_pixels(uploaded):
+    """
+    Отклоняет изображения со слишком большим числом пикселей.
+    """
+    image = getattr(uploaded, 'image', None)
+    if image is not None and image.width * image.height > IMAGE_MAX_PIXELS:
+        raise ValidationError('Изображение слишком большое.')
+    return uploaded
+
+
+def rendition_name(name, rendition, fmt):
+    """
+    Имя файла варианта изображения рядом с оригиналом.
+    """
+    stem = os.path.splitext(name)[0]
+    return f'{stem}.{rendition}.{fmt}'
+
+
+def rendition_urls(name, renditions):
+    """
+    Адреса вариантов изображения вида {вариант: {формат: url}}.
+    Пока вариант не создан, вместо него отдается адрес оригинала.
+    """
+    if not name:
+        return None
+    original = default_storage.url(name)
+    urls = {}
+    for rendition in renditions:
+        urls[rendition] = {}
+        for fmt in RENDITION_FORMATS:
+            path = rendition_name(name, rendition, fmt)
+            urls[rendition][fmt] = (
+                default_storage.url(path) if default_storage.exists(path)
+                else original)
+    return urls
+
+
+def make_renditions(name, renditions):
+    """
+    Создает недостающие варианты изображения.
+    """
+    missing = [
+        (rendition, size, fmt)
+        for rendition, size in renditions.items()
+        for fmt in RENDITION_FORMATS
+        if not default_storage.exists(rendition_name(name, rendition, fmt))
+    ]
+    if not missing:
+        return 0
+    with default_storage.open(name) as original:
+        source = Image.open(original)
+        source.load()
+    for rendition, size, fmt in missing:
+        image = source.copy()
+        image.thumbnail(size)
+        if fmt == 'jpeg' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        buffer = BytesIO()
+        image.save(buffer, RENDITION_FORMATS[fmt], quality=IMAGE_QUALITY)
+        default_storage.save(rendition_name(name, rendition, fmt),
+                             ContentFile(buffer.getvalue()))
+    return len(missing)
+
+
+def remember_image(instance, field):
+    """
+    Запоминает имя сохраненного в базе файла изображения.
+    Отложенные поля не загружаются.
+    """
+    value = instance.__dict__.get(field)
+    instance.__dict__[f'_saved_{field}'] = getattr(value, 'name', value)
+
+
+def image_changed(instance, field, created, update_fields):
+    """
+    Изменилось ли изображение при сохранении объекта:
+    объект создан, поле указано в update_fields
+    или при полном сохранении изменилось имя файла.
+    """
+    name = getattr(instance, field).name
+    if created:
+        changed = True
+    elif update_fields is not None:
+        changed = field in update_fields
+    else:
+        changed = name != instance.__dict__.get(f'_saved_{field}')
+    instance.__dict__[f'_saved_{field}'] = name
+    return changed
+
+
+def schedule_renditions(name, renditions):
+    """
+    Ставит создание вариантов в пул после фиксации транзакции.
+    Ошибки задачи записываются в лог.
+    """
+    if name:
+        transaction.on_commit(lambda: executor.submit(
+            make_renditions, name, renditions
+        ).add_done_callback(lambda future: log_failure(future, name)))
+
+
+def log_failure(future, name):
+    error = future.exception()
+    if error is not None:
+        logger.error('Не удалось создать варианты изображения %s', name,
+                     exc_info=error)
+
+
+def delete_renditions(name, renditions):
+    """
+    Удаляет варианты изображения.
+    """
+    for rendition in renditions:
+        for fmt in RENDITION_FORMATS:
+            default_storage.delete(rendition_name(name, rendition, fmt))
@@ -0,0 +1,250 @@
+import os
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.renderers import JSONRenderer
+
+from core.constans import METRICS_BUCKETS
+
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    """
+    Показатели одного запроса.
+    """
+    __slots__ = ('queries', 'db_time', 'render_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+class Series:
+    """
+    Накопленные показатели одного представления.
+    """
+    __slots__ = ('buckets', 'count', 'duration', 'queries', 'db_time',
+                 'render_time', 'response_bytes')
+
+    def __init__(self):
+        self.buckets = [0] * (len(METRICS_BUCKETS) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    """
+    Метрики процесса по представлениям и методам.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.series = {}
+        self.statuses = {}
+
+    def observe(self, view, method, status, duration, stats, size):
+        key = (view, method)
+        status_key = (view, method, status)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = Series()
+            series.buckets[bisect_left(METRICS_BUCKETS, duration)] += 1
+            series.count += 1
+            series.duration += duration
+            series.queries += stats.queries
+            series.db_time += stats.db_time
+            series.render_time += stats.render_time
+            series.response_bytes += size
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+
+    def render(self):
+        """
+        Метрики в текстовом формате Prometheus.
+        """
+        with self.lock:
+            series = {
+                key: (list(value.buckets), value.count, value.duration,
+                      value.queries, value.db_time, value.render_time,
+                      value.response_bytes)
+                for key, value in self.series.items()
+            }
+            statuses = dict(self.statuses)
+        worker = os.getpid()
+        lines = [
+            '# HELP foodgram_requests_total Количество запросов.',
+            '# TYPE foodgram_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(statuses.items()):
+            lines.append(
+                f'foodgram_requests_total{{{labels(view, method, worker)},'
+                f'status="{status}"}} {count}')
+        lines += [
+            '# HELP foodgram_request_duration_seconds Время ответа.',
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        for (view, method), values in sorted(series.items()):
+            buckets, count, duration = values[:3]
+            label = labels(view, method, worker)
+            total = 0
+            for bound, bucket in zip(METRICS_BUCKETS + ('+Inf',), buckets):
+                total += bucket
+                lines.append(
+                    f'foodgram_request_duration_seconds_bucket'
+                    f'{{{label},le="{bound}"}} {total}')
+            lines.append(
+                f'foodgram_request_duration_seconds_sum{{{label}}} '
+                f'{duration}')
+            lines.append(
+                f'foodgram_request_duration_seconds_count{{{label}}} '
+                f'{count}')
+        for index, name, help_text in (
+            (3, 'foodgram_db_queries_total', 'Запросы к БД.'),
+            (4, 'foodgram_db_duration_seconds_total', 'Время запросов к БД.'),
+            (5, 'foodgram_render_duration_seconds_total',
+             'Время рендеринга ответа.'),
+            (6, 'foodgram_response_bytes_total', 'Размер ответов.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method), values in sorted(series.items()):
+                lines.append(
+                    f'{name}{{{labels(view, method, worker)}}} '
+                    f'{values[index]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def labels(view, method, worker):
+    view = view.replace('\\', '\\\\').replace('"', '\\"')
+    return f'view="{view}",method="{method}",worker="{worker}"'
+
+
+def view_name(request):
+    """
+    Имя маршрута запроса. Для неразрешенных путей общее имя,
+    чтобы число рядов не росло от произвольных адресов.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения запросов к БД, учитывает их число и время.
+    """
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += perf_counter() - started
+
+
+def add_query_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """
+    Подключает учет запросов к БД для новых соединений.
+    """
+    connection_created.connect(add_query_wrapper,
+                               dispatch_uid='metrics_query_wrapper')
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, замеряющий время рендеринга ответа DRF.
+    Подключается в DEFAULT_RENDERER_CLASSES вместе с MetricsMiddleware.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        stats = current.get()
+        if stats is None:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        started = perf_counter()
+        try:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        finally:
+            stats.render_time += perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Собирает по представлениям время ответа, число и время запросов
+    к БД, время рендеринга и размер ответа.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current.set(stats)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.observe(request, response, perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current.set(stats)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        self.observe(request, response, perf_counter() - started, stats)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration, stats):
+        registry.observe(
+            view_name(request), request.method, response.status_code,
+            duration, stats,
+            0 if response.streaming else len(response.content))
+
+
+def metrics_view(request):
+    """
+    Метрики процесса для Prometheus.
+    Доступны только с токеном METRICS_TOKEN в заголовке
+    Authorization: Bearer. Адрес клиента не проверяется: за nginx
+    это всегда адрес прокси. Без токена в настройках метрики закрыты.
+    """
+    header = request.headers.get('Authorization', '')
+    if not settings.METRICS_TOKEN or not constant_time_compare(
+            header, f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
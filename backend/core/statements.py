@@ -0,0 +1,100 @@
+from csv import writer
+from io import StringIO
+
+from django.db import connection, transaction
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def insert_ignore(model, fields, rows, returning):
+    """
+    Вставка одним запросом INSERT ... ON CONFLICT DO NOTHING.
+    Возвращает значения поля returning только у вставленных строк,
+    поэтому конкурирующие вставки не приводят к IntegrityError.
+    """
+    if not rows:
+        return []
+    placeholders = ', '.join(
+        ['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+    sql = (
+        f'INSERT INTO {_table(model)} '
+        f'({", ".join(_column(model, field) for field in fields)}) '
+        f'VALUES {placeholders} ON CONFLICT DO NOTHING '
+        f'RETURNING {_column(model, returning)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_returning(model, returning, **filters):
+    """
+    Удаление одним запросом DELETE ... RETURNING.
+    Фильтры задаются как поле=значение или поле=список значений.
+    Возвращает значения поля returning у удаленных строк.
+    """
+    conditions = []
+    params = []
+    for name, value in filters.items():
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = list(value)
+            if not value:
+                return []
+            conditions.append(
+                f'{_column(model, name)} IN '
+                f'({", ".join(["%s"] * len(value))})')
+            params.extend(value)
+        else:
+            conditions.append(f'{_column(model, name)} = %s')
+            params.append(value)
+    sql = (
+        f'DELETE FROM {_table(model)} WHERE {" AND ".join(conditions)} '
+        f'RETURNING {_column(model, returning)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def copy_insert_ignore(model, fields, rows):
+    """
+    Пакетная вставка с пропуском конфликтующих строк.
+    На PostgreSQL строки передаются через COPY во временную таблицу
+    и переносятся одним INSERT ... SELECT ... ON CONFLICT DO NOTHING,
+    на других СУБД используется insert_ignore.
+    Возвращает количество вставленных строк.
+    """
+    if not rows:
+        return 0
+    if connection.vendor != 'postgresql':
+        return len(insert_ignore(
+            model, fields, rows, returning=model._meta.pk.name))
+    table = _table(model)
+    staging = connection.ops.quote_name(f'{model._meta.db_table}_staging')
+    columns = ', '.join(_column(model, field) for field in fields)
+    buffer = StringIO()
+    writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {staging} '
+            f'AS SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT DISTINCT {columns} FROM {staging} '
+            f'ON CONFLICT DO NOTHING'
+        )
+        inserted = cursor.rowcount
+        cursor.execute(f'TRUNCATE {staging}')
+    return inserted
@@ -0,0 +1,87 @@
+import os
+import shutil
+from uuid import uuid4
+
+from django.core.files import File
+from rest_framework.exceptions import ValidationError
+
+from core.constans import UPLOAD_CHUNK_SIZE
+
+
+class UploadedImage(File):
+    """
+    Собранный файл загрузки.
+    Хранилище перемещает его в MEDIA_ROOT без копирования.
+    Файл не держится открытым: проверка изображения и перемещение
+    работают по пути, а содержимое читается только в chunks.
+    """
+    def __init__(self, path, name):
+        super().__init__(None, name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def chunks(self, chunk_size=None):
+        with open(self.path, 'rb') as file:
+            yield from File(file).chunks(chunk_size)
+
+
+def write_chunks(path, chunks, limit, mode='ab'):
+    """
+    Дописывает части в файл, не превышая limit байт.
+    Возвращает количество записанных байт.
+    При превышении размера файл возвращается к исходной длине.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = os.path.getsize(path) if mode == 'ab' and os.path.exists(
+        path) else 0
+    written = 0
+    with open(path, mode) as target:
+        for chunk in chunks:
+            written += len(chunk)
+            if written > limit:
+                target.truncate(start)
+                raise ValidationError('Превышен размер загрузки.')
+            target.write(chunk)
+    return written
+
+
+def part_path(path):
+    """
+    Путь временного файла для одной части загрузки.
+    """
+    return f'{path}.{uuid4().hex}.part'
+
+
+def copy_at(source, path, offset):
+    """
+    Записывает содержимое файла source в файл path с позиции offset.
+    """
+    with open(source, 'rb') as part, open(path, 'r+b') as target:
+        target.seek(offset)
+        shutil.copyfileobj(part, target, UPLOAD_CHUNK_SIZE)
+
+
+def read_stream(stream):
+    """
+    Читает поток тела запроса частями.
+    """
+    if stream is None:
+        return
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
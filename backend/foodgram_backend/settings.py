@@ -1,11 +1,13 @@
 # flake8: noqa
 import os
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 from pathlib import Path
 from dotenv import load_dotenv
 from django.core.management.utils import get_random_secret_key
 
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,6 +20,10 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', default=[]).split(',')
 
 DOMAIN = os.getenv('DOMAIN')
 
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='False') == 'True'
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
 CSRF_TRUSTED_ORIGINS = [
     os.getenv('CSRF_DOMAIN'),
 ]
@@ -29,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_cleanup.apps.CleanupConfig',
     'djoser',
     'rest_framework',
@@ -37,7 +44,6 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
@@ -48,9 +54,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.metrics.MetricsMiddleware')
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -86,6 +98,37 @@ DATABASES = {
     }
 }
 
+if os.getenv('USE_SQLITE', default='False') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# В кеше хранятся версии каталогов тегов и ингредиентов
+# (recipes/versions.py), по ним сбрасываются индекс ингредиентов,
+# кеш представлений рецептов и ETag. LocMemCache свой у каждого
+# процесса, и изменение, сделанное в одном воркере, другие не увидят.
+# Поэтому с ним допускается только один воркер gunicorn
+# (WEB_CONCURRENCY), для нескольких нужен общий кеш, например
+# django.core.cache.backends.db.DatabaseCache или RedisCache.
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
+    if int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+        raise ImproperlyConfigured(
+            'LocMemCache не разделяется между процессами, при '
+            'WEB_CONCURRENCY > 1 задайте общий кеш в CACHE_BACKEND.')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,6 +162,13 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+
+# Карта коротких ссылок для nginx. Хранится вне MEDIA_ROOT,
+# чтобы ее нельзя было скачать через /media/.
+SHORT_LINKS_MAP_DIR = os.getenv(
+    'SHORT_LINKS_MAP_DIR', os.path.join(BASE_DIR, 'short_links'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -135,6 +185,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
 }
 
+if METRICS_ENABLED:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'core.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
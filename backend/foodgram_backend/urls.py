@@ -7,6 +7,10 @@ urlpatterns = [
     path('', include('api.urls')),
 ]
 
+if settings.METRICS_ENABLED:
+    from core.metrics import metrics_view
+    urlpatterns.append(path('metrics/', metrics_view, name='metrics'))
+
 if settings.DEBUG:
     import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
@@ -12,6 +12,7 @@ from recipes.models import (
     FavoriteRecipe,
     Ingredient,
     ShoppingCart,
+    ShoppingCartIngredient,
     IngredientRecipeAmountModel,
     TagRecipe
 )
@@ -58,19 +59,29 @@ class RecipeAdmin(admin.ModelAdmin):
     Панель редактирования рецептов.
     Включает инлайн-классы для гибкой настройки.
     """
-    list_display = ('id', 'name', 'author_username', 'image_tag')
+    list_display = ('id', 'name', 'author_username', 'image_tag',
+                    'favorites_count', 'shopping_cart_count')
+    list_select_related = ('author',)
+    readonly_fields = ('favorites_count', 'shopping_cart_count')
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('tags',)
     ordering = ('-id',)
     inlines = [IngredientRecipeInline, TagRecipeInline]
     filter_horizontal = ('tags',)
 
+    def save_related(self, request, form, formsets, change):
+        """
+        Переносит изменение ингредиентов в списки покупок.
+        """
+        old_amounts = ShoppingCartIngredient.objects.recipe_amounts(
+            form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        ShoppingCartIngredient.objects.apply_recipe_change(
+            form.instance.pk, old_amounts)
+
     def author_username(self, obj):
         return obj.author.username
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-
     def image_tag(self, obj):
         if obj.image:
             return mark_safe('<img src="{}" width="150"'
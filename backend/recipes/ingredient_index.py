@@ -0,0 +1,90 @@
+from bisect import bisect_left
+from difflib import get_close_matches
+from time import monotonic
+
+from core.constans import INGREDIENT_INDEX_TTL, SIMILARITY_CUTOFF
+from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION, bump_version, get_version
+
+
+def normalize(value):
+    """
+    Приводит строку к виду для сравнения без учета регистра и ё/е.
+    """
+    return value.strip().casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Префиксный индекс ингредиентов на отсортированном массиве.
+    """
+    def __init__(self, rows):
+        self.rows = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in rows
+        ]
+        self.entries = sorted(
+            (normalize(row['name']), row['id'], row)
+            for row in self.rows
+        )
+        self.keys = [entry[0] for entry in self.entries]
+
+    def search(self, prefix, limit=None):
+        """
+        Ингредиенты, название которых начинается с prefix.
+        Сначала точное совпадение, затем более короткие названия.
+        """
+        prefix = normalize(prefix)
+        matches = []
+        position = bisect_left(self.keys, prefix)
+        while (position < len(self.keys)
+               and self.keys[position].startswith(prefix)):
+            matches.append(self.entries[position])
+            position += 1
+        matches.sort(key=lambda entry: (
+            entry[0] != prefix, len(entry[0]), entry[0], entry[1]))
+        return [entry[2] for entry in matches[:limit]]
+
+
+def similar_ids(index, value, limit=None):
+    """
+    Идентификаторы ингредиентов с похожими названиями,
+    от более похожих к менее похожим.
+    Запасной вариант нечеткого поиска для баз без pg_trgm.
+    """
+    names = get_close_matches(
+        normalize(value), index.keys,
+        n=limit or len(index.keys), cutoff=SIMILARITY_CUTOFF)
+    ids = {}
+    for entry in index.entries:
+        ids.setdefault(entry[0], []).append(entry[1])
+    return [pk for name in names for pk in ids[name]]
+
+
+_state = {'index': None, 'version': None, 'loaded_at': 0.0}
+
+
+def get_ingredient_index(version=None):
+    """
+    Возвращает индекс процесса, перестраивая его при смене версии.
+    Уже загруженную версию каталога можно передать в version.
+    """
+    if version is None:
+        version = get_version(INGREDIENTS_VERSION)
+    if (_state['index'] is None
+            or _state['version'] != version
+            or monotonic() - _state['loaded_at'] > INGREDIENT_INDEX_TTL):
+        _state['index'] = IngredientIndex(
+            Ingredient.objects.order_by('id').values_list(
+                'id', 'name', 'measurement_unit'))
+        _state['version'] = version
+        _state['loaded_at'] = monotonic()
+    return _state['index']
+
+
+def invalidate_ingredient_index():
+    """
+    Помечает индексы всех процессов устаревшими.
+    """
+    bump_version(INGREDIENTS_VERSION)
+    _state['index'] = None
@@ -0,0 +1,132 @@
+import json
+import re
+from csv import reader
+from itertools import islice
+
+from django.db import transaction
+
+from core.constans import (IMPORT_BATCH_SIZE, IMPORT_READ_SIZE,
+                           MAX_INGREDIENT, MAX_UNIT)
+from core.statements import copy_insert_ignore
+from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION, bump_version
+
+WHITESPACE = re.compile(r'\s*')
+
+
+def read_csv(file):
+    """
+    Построчно читает пары (название, единица измерения) из csv.
+    """
+    for row in reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def read_json(file, read_size=IMPORT_READ_SIZE):
+    """
+    Потоково читает JSON-массив объектов с полями name
+    и measurement_unit, не загружая файл целиком.
+    """
+    for item in iter_json_array(file, read_size):
+        if not isinstance(item, dict):
+            raise ValueError('Ожидался объект ингредиента.')
+        yield item.get('name') or '', item.get('measurement_unit') or ''
+
+
+def iter_json_array(file, read_size=IMPORT_READ_SIZE):
+    """
+    Возвращает элементы JSON-массива по мере чтения файла.
+    После закрывающей скобки допускаются только пробельные символы.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    state = 'open'
+    eof = False
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                if state == 'end':
+                    return
+                raise ValueError('Неожиданный конец JSON-массива.')
+            buffer, position, eof = _read_more(file, buffer, position,
+                                               read_size)
+            continue
+        char = buffer[position]
+        if state == 'end':
+            raise ValueError(
+                f'Лишние данные после JSON-массива: {char!r}.')
+        if state == 'open':
+            if char != '[':
+                raise ValueError('Ожидался JSON-массив.')
+            position += 1
+            state = 'first'
+        elif state in ('first', 'next') and char == ']':
+            position += 1
+            state = 'end'
+        elif state == 'next':
+            if char != ',':
+                raise ValueError(f'Ожидалась запятая, получено {char!r}.')
+            position += 1
+            state = 'item'
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                buffer, position, eof = _read_more(file, buffer, position,
+                                                   read_size)
+                continue
+            position = end
+            state = 'next'
+            yield item
+
+
+def _read_more(file, buffer, position, read_size):
+    chunk = file.read(read_size)
+    return buffer[position:] + chunk, 0, not chunk
+
+
+def clean_rows(rows):
+    """
+    Обрезает пробелы у названия и единицы измерения.
+    Вместо пустых и слишком длинных значений возвращает None.
+    """
+    for name, unit in rows:
+        name, unit = str(name).strip(), str(unit).strip()
+        if (not name or not unit or len(name) > MAX_INGREDIENT
+                or len(unit) > MAX_UNIT):
+            yield None
+        else:
+            yield name, unit
+
+
+def load_ingredients(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Загружает ингредиенты пакетами, пропуская уже существующие.
+    Память ограничена размером пакета. Версия каталога обновляется
+    в транзакции пакета, добавившего ингредиенты.
+    Возвращает количество добавленных, пропущенных
+    и некорректных строк.
+    """
+    inserted = skipped = invalid = 0
+    rows = clean_rows(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return inserted, skipped, invalid
+        valid = [row for row in batch if row is not None]
+        invalid += len(batch) - len(valid)
+        unique = list(dict.fromkeys(valid))
+        with transaction.atomic():
+            added = copy_insert_ignore(
+                Ingredient, ('name', 'measurement_unit'), unique)
+            if added:
+                bump_version(INGREDIENTS_VERSION)
+        inserted += added
+        skipped += len(valid) - added
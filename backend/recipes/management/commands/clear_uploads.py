@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from core.constans import UPLOAD_TTL
+from users.models import ImageUpload
+
+
+class Command(BaseCommand):
+
+    help = "Удаляет устаревшие загрузки изображений вместе с файлами"
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(seconds=UPLOAD_TTL)
+        deleted, _ = ImageUpload.objects.filter(
+            created_at__lt=deadline).delete()
+        self.stdout.write(f'Удалено загрузок: {deleted}')
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from core.constans import (AVATAR_RENDITIONS, ITERATOR_CHUNK_SIZE,
+                           RECIPE_RENDITIONS)
+from core.images import make_renditions
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = "Создает недостающие уменьшенные варианты изображений"
+
+    def handle(self, *args, **options):
+        sources = (
+            (Recipe.objects.exclude(image=''), 'image', RECIPE_RENDITIONS),
+            (User.objects.exclude(avatar=''), 'avatar', AVATAR_RENDITIONS),
+        )
+        created = 0
+        for queryset, field, renditions in sources:
+            names = queryset.filter(**{f'{field}__isnull': False}).values_list(
+                field, flat=True)
+            for name in names.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                try:
+                    created += make_renditions(name, renditions)
+                except OSError as error:
+                    self.stderr.write(f'{name}: {error}')
+        self.stdout.write(f'Создано вариантов: {created}')
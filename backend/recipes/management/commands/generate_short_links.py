@@ -0,0 +1,74 @@
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe, ShortLink
+from recipes.short_links import new_codes
+
+from core.constans import ITERATOR_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+
+    help = ("Создает недостающие короткие ссылки и выгружает "
+            "карту кодов для nginx")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=ITERATOR_CHUNK_SIZE,
+            help='Количество ссылок в одном запросе'
+        )
+        parser.add_argument(
+            '--map', dest='map_path',
+            default=os.path.join(settings.SHORT_LINKS_MAP_DIR,
+                                 'short_links.map'),
+            help='Файл карты кодов для nginx'
+        )
+        parser.add_argument(
+            '--no-map', action='store_true',
+            help='Не выгружать карту кодов'
+        )
+
+    def handle(self, *args, batch_size, map_path, no_map, **options):
+        created = 0
+        recipe_ids = Recipe.objects.filter(
+            shortlink__isnull=True
+        ).order_by('id').values_list('id', flat=True)
+        batch = []
+        for recipe_id in recipe_ids.iterator(chunk_size=batch_size):
+            batch.append(recipe_id)
+            if len(batch) >= batch_size:
+                created += self.save(batch, batch_size)
+                batch = []
+        created += self.save(batch, batch_size)
+        self.stdout.write(f'Создано ссылок: {created}')
+        if not no_map:
+            exported = self.export(map_path, batch_size)
+            self.stdout.write(f'Выгружено ссылок в {map_path}: {exported}')
+
+    @staticmethod
+    def save(recipe_ids, batch_size):
+        return len(ShortLink.objects.bulk_create(
+            [ShortLink(recipe_id=recipe_id, link=link)
+             for recipe_id, link in new_codes(recipe_ids).items()],
+            batch_size=batch_size, ignore_conflicts=True))
+
+    @staticmethod
+    def export(map_path, batch_size):
+        """
+        Записывает строки карты nginx вида `код /recipes/id/;`.
+        Файл сначала пишется во временный, чтобы nginx
+        никогда не прочитал его частично.
+        """
+        os.makedirs(os.path.dirname(map_path) or '.', exist_ok=True)
+        tmp_path = f'{map_path}.tmp'
+        exported = 0
+        links = ShortLink.objects.order_by('recipe_id').values_list(
+            'link', 'recipe_id')
+        with open(tmp_path, 'w', encoding='utf-8') as map_file:
+            for link, recipe_id in links.iterator(chunk_size=batch_size):
+                map_file.write(f'{link} /recipes/{recipe_id}/;\n')
+                exported += 1
+        os.replace(tmp_path, map_path)
+        return exported
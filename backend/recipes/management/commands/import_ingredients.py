@@ -1,25 +1,52 @@
-from csv import DictReader
+from pathlib import Path
+from time import monotonic
 
 from django.conf import settings
-from django.core.management import BaseCommand
-from recipes.models import Ingredient
+from django.core.management import BaseCommand, CommandError
+
+from core.constans import IMPORT_BATCH_SIZE
+from recipes.ingredient_loader import load_ingredients, read_csv, read_json
 
-from core.constans import MIN_COUNT
 DATA_DIR = settings.BASE_DIR / 'data'
+READERS = {'csv': read_csv, 'json': read_json}
 
 
 class Command(BaseCommand):
 
-    help = "Загружает ингредиенты в БД из csv"
+    help = (
+        "Загружает ингредиенты в БД из csv или json, "
+        "пропуская уже существующие"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DATA_DIR / 'ingredients.csv'),
+            help='Файл с ингредиентами')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла, по умолчанию по расширению')
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Количество строк в одном запросе')
 
     def handle(self, *args, **options):
-        with open(
-            DATA_DIR / 'ingredients.csv', encoding='utf-8'
-        ) as ingredients:
-            if Ingredient.objects.count() < MIN_COUNT:
-                ingredients_to_load = []
-                for row in DictReader(
-                    ingredients, fieldnames=['name', 'measurement_unit']
-                ):
-                    ingredients_to_load.append(Ingredient(**row))
-                Ingredient.objects.bulk_create(ingredients_to_load)
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше нуля.')
+        started = monotonic()
+        with open(path, encoding='utf-8', newline='') as file:
+            try:
+                inserted, skipped, invalid = load_ingredients(
+                    READERS[file_format](file), options['batch_size'])
+            except ValueError as error:
+                raise CommandError(f'Ошибка в файле {path}: {error}')
+        elapsed = monotonic() - started
+        total = inserted + skipped + invalid
+        self.stdout.write(
+            f'Добавлено: {inserted}, пропущено: {skipped}, '
+            f'некорректных: {invalid}, '
+            f'{total / elapsed if elapsed else total:.0f} строк/с'
+        )
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+
+    help = "Пересобирает суммарные списки покупок по корзинам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Пересобрать только для указанных пользователей'
+        )
+
+    def handle(self, *args, user_ids=None, **options):
+        created = ShoppingCartIngredient.objects.rebuild(user_ids)
+        self.stdout.write(f'Создано строк: {created}')
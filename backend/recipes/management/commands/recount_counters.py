@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from core.counters import recount
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'following'),
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+)
+
+
+class Command(BaseCommand):
+
+    help = "Пересчитывает счетчики рецептов, подписчиков и избранного"
+
+    def handle(self, *args, **options):
+        for model, field, related_model, fk_name in COUNTERS:
+            fixed = recount(model, field, related_model, fk_name)
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено строк {fixed}')
@@ -0,0 +1,128 @@
+from random import Random
+from time import monotonic
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+
+from core.constans import SEED_BATCH_SIZE
+from recipes.models import FavoriteRecipe, Ingredient, ShoppingCart, Tag
+from recipes.seed import (PowerLawSampler, create_pairs, create_recipes,
+                          create_users, import_recipes, placeholder_image,
+                          read_jsonl)
+from recipes.versions import TAGS_VERSION, bump_version
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Генерирует синтетические данные для нагрузочного тестирования "
+        "или загружает рецепты из дампа JSON Lines"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=6,
+                            help='Сколько тегов создать, если их нет')
+        parser.add_argument(
+            '--exponent', type=float, default=1.0,
+            help='Показатель степенного распределения популярности')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел')
+        parser.add_argument(
+            '--prefix', help='Префикс имен пользователей, по умолчанию '
+                             'seed<зерно>_')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--batch-size', type=int,
+                            default=SEED_BATCH_SIZE)
+        parser.add_argument(
+            '--import', dest='import_path',
+            help='Загрузить рецепты из файла JSON Lines вместо генерации')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше нуля.')
+        self.image = placeholder_image()
+        if options['import_path']:
+            self.import_dump(options)
+        else:
+            self.generate(options)
+        self.step('Пересчет счетчиков', lambda: call_command(
+            'recount_counters', stdout=self.stdout))
+
+    def step(self, title, func):
+        started = monotonic()
+        result = func()
+        self.stdout.write(f'{title}: {monotonic() - started:.1f} с')
+        return result
+
+    def generate(self, options):
+        rng = Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix'] or f'seed{options["seed"]}_'
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже созданы, '
+                f'укажите другой --prefix или --seed.')
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов, сначала выполните import_ingredients.')
+        tag_ids = self.tag_ids(options['tags'])
+        exponent = options['exponent']
+        user_ids = self.step('Пользователи', lambda: create_users(
+            options['users'], prefix, options['password'], batch_size))
+        if not user_ids:
+            return
+        self.stdout.write(f'Создано пользователей: {len(user_ids)}')
+        recipe_ids = self.step('Рецепты', lambda: create_recipes(
+            options['recipes'], PowerLawSampler(user_ids, rng, exponent),
+            tag_ids, ingredient_ids, rng, self.image, batch_size))
+        self.stdout.write(f'Создано рецептов: {len(recipe_ids)}')
+        users = PowerLawSampler(user_ids, rng, exponent)
+        if recipe_ids:
+            recipes = PowerLawSampler(recipe_ids, rng, exponent)
+            for model, count in ((FavoriteRecipe, options['favorites']),
+                                 (ShoppingCart, options['carts'])):
+                created = self.step(model._meta.verbose_name_plural,
+                                    lambda: create_pairs(
+                                        model, ('user', 'recipe'), count,
+                                        users, recipes,
+                                        batch_size=batch_size))
+                self.stdout.write(f'Создано строк: {created}')
+            self.step('Пересборка списков покупок', lambda: call_command(
+                'rebuild_shopping_carts', stdout=self.stdout))
+        created = self.step('Подписки', lambda: create_pairs(
+            Subscription, ('user', 'following'), options['follows'], users,
+            PowerLawSampler(user_ids, rng, exponent), distinct=True,
+            batch_size=batch_size))
+        self.stdout.write(f'Создано подписок: {created}')
+
+    def import_dump(self, options):
+        tag_ids = dict(Tag.objects.values_list('slug', 'pk'))
+        with open(options['import_path'], encoding='utf-8') as file:
+            imported, invalid = self.step(
+                'Импорт рецептов', lambda: import_recipes(
+                    read_jsonl(file), tag_ids, self.image,
+                    options['password'], options['batch_size']))
+        self.stdout.write(
+            f'Загружено рецептов: {imported}, некорректных: {invalid}')
+
+    def tag_ids(self, count):
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        if tag_ids or count < 1:
+            return tag_ids
+        with transaction.atomic():
+            Tag.objects.bulk_create([
+                Tag(name=f'Тег {index}', slug=f'tag{index}')
+                for index in range(1, count + 1)
+            ])
+            bump_version(TAGS_VERSION)
+        return list(Tag.objects.values_list('pk', flat=True))
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.15 on 2026-10-17 07:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount(model, field, related_model, fk_name):
+    actual = Coalesce(
+        Subquery(
+            related_model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+    model.objects.exclude(**{field: actual}).update(**{field: actual})
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recount(User, 'recipes_count', Recipe, 'author')
+    recount(Recipe, 'favorites_count',
+            apps.get_model('recipes', 'FavoriteRecipe'), 'recipe')
+    recount(Recipe, 'shopping_cart_count',
+            apps.get_model('recipes', 'ShoppingCart'), 'recipe')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
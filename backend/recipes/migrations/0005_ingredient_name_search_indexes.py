@@ -0,0 +1,39 @@
+# Generated by Django 4.2.15 on 2026-10-17 08:05
+
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_lower_prefix '
+    'ON recipes_ingredient (LOWER(name) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_lower_trgm '
+    'ON recipes_ingredient USING gin (LOWER(name) gin_trgm_ops)',
+)
+DROP_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_lower_trgm',
+    'DROP INDEX IF EXISTS recipes_ingredient_name_lower_prefix',
+)
+
+
+def run_on_postgresql(statements):
+    """
+    Индексы нужны только на PostgreSQL, на SQLite миграция ничего не делает.
+    """
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SQL), run_on_postgresql(DROP_SQL)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-17 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shortlink',
+            name='link',
+            field=models.CharField(max_length=16, unique=True, verbose_name='Короткая ссылка'),
+        ),
+    ]
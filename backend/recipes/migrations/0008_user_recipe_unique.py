@@ -0,0 +1,77 @@
+# Generated by Django 4.2.15 on 2026-10-17 11:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount(model, field, related_model, fk_name):
+    actual = Coalesce(
+        Subquery(
+            related_model.objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+    model.objects.exclude(**{field: actual}).update(**{field: actual})
+
+
+def delete_duplicates(model):
+    first_ids = model.objects.values('user_id', 'recipe_id').annotate(
+        first_id=models.Min('id')).values('first_id')
+    deleted, _ = model.objects.exclude(id__in=first_ids).delete()
+    return deleted
+
+
+def remove_duplicate_user_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    if delete_duplicates(FavoriteRecipe):
+        recount(Recipe, 'favorites_count', FavoriteRecipe, 'recipe')
+    if delete_duplicates(ShoppingCart):
+        recount(Recipe, 'shopping_cart_count', ShoppingCart, 'recipe')
+        ShoppingCartIngredient = apps.get_model(
+            'recipes', 'ShoppingCartIngredient')
+        IngredientRecipeAmountModel = apps.get_model(
+            'recipes', 'IngredientRecipeAmountModel')
+        ShoppingCartIngredient.objects.all().delete()
+        totals = IngredientRecipeAmountModel.objects.filter(
+            recipe__shoppingcart__isnull=False
+        ).values(
+            'recipe__shoppingcart__user_id', 'ingredient_id'
+        ).annotate(total=models.Sum('amount')).order_by()
+        ShoppingCartIngredient.objects.bulk_create(
+            [
+                ShoppingCartIngredient(
+                    user_id=row['recipe__shoppingcart__user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    amount=row['total']
+                )
+                for row in totals.iterator()
+            ],
+            batch_size=2000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shortlink_base62'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_user_recipes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='favoriterecipe',
+            unique_together={('user', 'recipe')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='shoppingcart',
+            unique_together={('user', 'recipe')},
+        ),
+    ]
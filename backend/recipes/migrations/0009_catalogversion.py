@@ -0,0 +1,38 @@
+# Generated by Django 4.2.15 on 2026-10-17 08:49
+
+from time import time_ns
+from uuid import uuid4
+
+from django.db import migrations, models
+
+CATALOGS = ('tags_version', 'ingredients_version')
+
+
+def create_versions(apps, schema_editor):
+    CatalogVersion = apps.get_model('recipes', 'CatalogVersion')
+    CatalogVersion.objects.bulk_create([
+        CatalogVersion(key=key, version=f'{time_ns():x}.{uuid4().hex[:12]}')
+        for key in CATALOGS
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_user_recipe_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Каталог')),
+                ('version', models.CharField(max_length=64, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия каталога',
+                'verbose_name_plural': 'Версии каталогов',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.15 on 2026-10-17 09:30
+
+from django.db import migrations
+
+FOLDED_NAME = "REPLACE(LOWER(name), 'ё', 'е')"
+
+CREATE_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_lower_trgm',
+    'DROP INDEX IF EXISTS recipes_ingredient_name_lower_prefix',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_fold_prefix '
+    f'ON recipes_ingredient (({FOLDED_NAME}) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_fold_trgm '
+    f'ON recipes_ingredient USING gin (({FOLDED_NAME}) gin_trgm_ops)',
+)
+DROP_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_fold_trgm',
+    'DROP INDEX IF EXISTS recipes_ingredient_name_fold_prefix',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_lower_prefix '
+    'ON recipes_ingredient (LOWER(name) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_lower_trgm '
+    'ON recipes_ingredient USING gin (LOWER(name) gin_trgm_ops)',
+)
+
+
+def run_on_postgresql(statements):
+    """
+    Индексы нужны только на PostgreSQL, на SQLite миграция ничего не делает.
+    """
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SQL), run_on_postgresql(DROP_SQL)),
+    ]
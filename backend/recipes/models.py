@@ -1,11 +1,14 @@
-from uuid import uuid4
-
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
 
+from core.counters import shift_counter
+from core.statements import delete_returning, insert_ignore
+from recipes.short_links import new_codes
 from core.constans import (
-    MAX_TAG, MAX_INGREDIENT, MAX_UNIT,
-    RECIPE_MAX_FIELDS, SHORT_LINK_LENGTH, DESC_MAX_FIELD)
+    MAX_TAG, MAX_INGREDIENT, MAX_UNIT, ITERATOR_CHUNK_SIZE,
+    RECIPE_MAX_FIELDS, SHORT_LINK_MAX_LENGTH, DESC_MAX_FIELD,
+    CATALOG_VERSION_MAX_LENGTH)
 
 User = get_user_model()
 
@@ -67,6 +70,24 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """
+    Запросы рецептов.
+    """
+    def with_related(self):
+        """
+        Подгружает автора, теги и ингредиенты фиксированным числом запросов.
+        """
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientRecipeAmountModel.objects.select_related(
+                    'ingredient')
+            ),
+        )
+
+
 class Recipe(models.Model):
     """
     Модель рецептов.
@@ -111,6 +132,22 @@ class Recipe(models.Model):
         verbose_name='Время приготовления',
         help_text='В минутах'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -180,7 +217,7 @@ class ShortLink(models.Model):
         verbose_name='Рецепт'
     )
     link = models.CharField(
-        max_length=SHORT_LINK_LENGTH,
+        max_length=SHORT_LINK_MAX_LENGTH,
         unique=True,
         verbose_name='Короткая ссылка'
     )
@@ -191,13 +228,66 @@ class ShortLink(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.link:
-            self.link = str(uuid4())[:SHORT_LINK_LENGTH]
+            self.link = new_codes([self.recipe_id])[self.recipe_id]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Короткая ссылка для {self.recipe.name}"
 
 
+class UserRecipeManager(models.Manager):
+    """
+    Добавление и удаление рецептов в списки пользователя.
+    Запись выполняется одним запросом без предварительной проверки,
+    результат берется из RETURNING. Такие запросы не вызывают
+    сигналы модели, поэтому счетчики обновляются здесь.
+    """
+    def __init__(self, counter_field):
+        super().__init__()
+        self.counter_field = counter_field
+
+    @transaction.atomic
+    def add_recipes(self, user_id, recipe_ids):
+        """
+        Добавляет рецепты одним запросом INSERT ... ON CONFLICT.
+        Возвращает список добавленных идентификаторов.
+        """
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        added = insert_ignore(
+            self.model, ('user', 'recipe'),
+            [(user_id, pk) for pk in recipe_ids], returning='recipe')
+        self.recipes_changed(user_id, added, 1)
+        return added
+
+    @transaction.atomic
+    def remove_recipes(self, user_id, recipe_ids):
+        """
+        Удаляет рецепты одним запросом DELETE ... RETURNING.
+        Возвращает список удаленных идентификаторов.
+        """
+        removed = delete_returning(
+            self.model, 'recipe', user=user_id, recipe=list(recipe_ids))
+        self.recipes_changed(user_id, removed, -1)
+        return removed
+
+    def recipes_changed(self, user_id, recipe_ids, delta):
+        shift_counter(Recipe, recipe_ids, self.counter_field, delta)
+
+
+class ShoppingCartManager(UserRecipeManager):
+    """
+    Пакетные операции с корзиной с обновлением
+    суммарного списка покупок.
+    """
+    def recipes_changed(self, user_id, recipe_ids, delta):
+        super().recipes_changed(user_id, recipe_ids, delta)
+        ShoppingCartIngredient.objects.apply([user_id], {
+            ingredient_id: amount * delta
+            for ingredient_id, amount in ShoppingCartIngredient.objects
+            .recipes_amounts(recipe_ids).items()
+        })
+
+
 class BaseUserRecipe(models.Model):
     """
     Базовая модель для связей пользователя с рецептом.
@@ -225,7 +315,9 @@ class ShoppingCart(BaseUserRecipe):
     """
     Корзина пользователя.
     """
-    class Meta:
+    objects = ShoppingCartManager(counter_field='shopping_cart_count')
+
+    class Meta(BaseUserRecipe.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
 
@@ -237,9 +329,205 @@ class FavoriteRecipe(BaseUserRecipe):
     """
     Избранные рецепты пользователя.
     """
-    class Meta:
+    objects = UserRecipeManager(counter_field='favorites_count')
+
+    class Meta(BaseUserRecipe.Meta):
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
     def __str__(self):
         return super().__str__() + ' в избранное'
+
+
+class ShoppingCartIngredientManager(models.Manager):
+    """
+    Инкрементальное обновление суммарного списка покупок.
+    """
+    @staticmethod
+    def recipe_amounts(recipe_id):
+        """
+        Количество каждого ингредиента в рецепте.
+        """
+        return dict(
+            IngredientRecipeAmountModel.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        )
+
+    @staticmethod
+    def recipes_amounts(recipe_ids):
+        """
+        Суммарное количество каждого ингредиента в нескольких рецептах.
+        """
+        if not recipe_ids:
+            return {}
+        return dict(
+            IngredientRecipeAmountModel.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('ingredient_id').annotate(
+                total=models.Sum('amount')
+            ).order_by().values_list('ingredient_id', 'total')
+        )
+
+    def apply(self, user_ids, deltas):
+        """
+        Прибавляет изменения количества ингредиентов к спискам покупок
+        пользователей. Строки с нулевым итогом удаляются.
+        """
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        self.bulk_create(
+            [
+                self.model(user_id=user_id, ingredient_id=ingredient_id,
+                           amount=0)
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True
+        )
+        rows = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+        rows.update(amount=Greatest(
+            models.F('amount') + models.Case(
+                *[
+                    models.When(ingredient_id=ingredient_id, then=delta)
+                    for ingredient_id, delta in deltas.items()
+                ],
+                default=0
+            ),
+            0
+        ))
+        rows.filter(amount=0).delete()
+
+    def add_recipe(self, user_ids, recipe_id):
+        self.apply(user_ids, self.recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        if not user_ids:
+            return
+        self.apply(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in self.recipe_amounts(
+                recipe_id).items()
+        })
+
+    def apply_recipe_change(self, recipe_id, old_amounts):
+        """
+        Переносит изменение ингредиентов рецепта в списки покупок
+        пользователей, добавивших этот рецепт.
+        """
+        new_amounts = self.recipe_amounts(recipe_id)
+        deltas = {
+            ingredient_id: (new_amounts.get(ingredient_id, 0)
+                            - old_amounts.get(ingredient_id, 0))
+            for ingredient_id in new_amounts.keys() | old_amounts.keys()
+        }
+        self.apply_recipe_deltas(recipe_id, deltas)
+
+    def apply_recipe_deltas(self, recipe_id, deltas):
+        """
+        Применяет известные изменения количеств ингредиентов рецепта
+        к спискам покупок пользователей, добавивших этот рецепт.
+        """
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not deltas:
+            return
+        self.apply(
+            list(ShoppingCart.objects.filter(
+                recipe_id=recipe_id).values_list('user_id', flat=True)),
+            deltas
+        )
+
+    @transaction.atomic
+    def rebuild(self, user_ids=None):
+        """
+        Полностью пересчитывает списки покупок по корзинам.
+        Удаление и вставка выполняются в одной транзакции, чтобы
+        пользователи не видели пустых списков.
+        """
+        rows = self.all()
+        carts = {'recipe__shoppingcart__isnull': False}
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+            # Условия на корзину в одном filter(), иначе каждое
+            # добавит свое соединение и суммы умножатся.
+            carts = {'recipe__shoppingcart__user_id__in': user_ids}
+        rows.delete()
+        amounts = IngredientRecipeAmountModel.objects.filter(**carts)
+        totals = amounts.values(
+            'recipe__shoppingcart__user_id', 'ingredient_id'
+        ).annotate(total=models.Sum('amount')).order_by()
+        created = 0
+        batch = []
+        for row in totals.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            batch.append(self.model(
+                user_id=row['recipe__shoppingcart__user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total']
+            ))
+            if len(batch) >= ITERATOR_CHUNK_SIZE:
+                created += len(self.bulk_create(batch))
+                batch = []
+        created += len(self.bulk_create(batch))
+        return created
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Суммарное количество ингредиента в списке покупок пользователя.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        unique_together = ('user', 'ingredient')
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient.name} {self.amount}'
+
+
+class CatalogVersion(models.Model):
+    """
+    Версия каталога тегов или ингредиентов для ETag и ключей кеша.
+    Хранится в БД, чтобы ее изменения видели все процессы,
+    в том числе команды управления, и она переживала перезапуск.
+    """
+    key = models.CharField(
+        max_length=CATALOG_VERSION_MAX_LENGTH,
+        primary_key=True,
+        verbose_name='Каталог'
+    )
+    version = models.CharField(
+        max_length=CATALOG_VERSION_MAX_LENGTH,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        verbose_name = 'Версия каталога'
+        verbose_name_plural = 'Версии каталогов'
+
+    def __str__(self):
+        return f'{self.key} {self.version}'
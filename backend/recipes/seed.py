@@ -0,0 +1,290 @@
+import json
+from array import array
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from core.constans import (DESC_MAX_FIELD, MAX_INGREDIENT, MAX_NAME,
+                           MAX_SMALLINT, MAX_UNIT, MIN_AMOUNT,
+                           RECIPE_MAX_FIELDS,
+                           RECIPE_RENDITIONS, SEED_BATCH_SIZE,
+                           SEED_PLACEHOLDER)
+from core.images import make_renditions
+from core.statements import copy_insert_ignore
+from recipes.models import (Ingredient, IngredientRecipeAmountModel, Recipe,
+                            TagRecipe)
+from recipes.versions import INGREDIENTS_VERSION, bump_version
+
+User = get_user_model()
+
+SEED_EMAIL_DOMAIN = 'seed.invalid'
+WORDS = (
+    'нарезать', 'смешать', 'обжарить', 'добавить', 'посолить', 'перец',
+    'лук', 'морковь', 'масло', 'духовка', 'минуты', 'соус', 'тесто',
+    'сковорода', 'огонь', 'подавать', 'зелень', 'чеснок', 'варить', 'до',
+    'готовности', 'и', 'на', 'с', 'в',
+)
+
+
+def placeholder_image():
+    """
+    Создает общее изображение-заглушку для сгенерированных рецептов
+    вместе с уменьшенными вариантами и возвращает его имя.
+    При удалении рецептов заглушка сохраняется (recipes/signals.py).
+    """
+    if not default_storage.exists(SEED_PLACEHOLDER):
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), (222, 184, 135)).save(buffer, 'PNG')
+        default_storage.save(SEED_PLACEHOLDER, ContentFile(buffer.getvalue()))
+    make_renditions(SEED_PLACEHOLDER, RECIPE_RENDITIONS)
+    return SEED_PLACEHOLDER
+
+
+class PowerLawSampler:
+    """
+    Выбор ключей с вероятностью, убывающей как 1 / rank ** exponent.
+    Ранги назначаются случайно, чтобы популярность не совпадала
+    с порядком создания.
+    """
+    def __init__(self, ids, rng, exponent):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.ids) + 1)))
+        self.rng = rng
+
+    def sample(self, k):
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+def batches(count, batch_size):
+    """
+    Размеры пакетов, в сумме дающие count.
+    """
+    for start in range(0, count, batch_size):
+        yield min(batch_size, count - start)
+
+
+def create_users(count, prefix, password, batch_size=SEED_BATCH_SIZE):
+    """
+    Создает пользователей пакетами с одним на всех хешем пароля.
+    Возвращает массив их ключей.
+    """
+    password = make_password(password)
+    ids = array('q')
+    for number, size in enumerate(batches(count, batch_size)):
+        start = number * batch_size
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{prefix}{index}',
+                    email=f'{prefix}{index}@{SEED_EMAIL_DOMAIN}',
+                    first_name='Пользователь',
+                    last_name=str(index),
+                    password=password
+                )
+                for index in range(start, start + size)
+            ])
+        ids.extend(user.pk for user in users)
+    return ids
+
+
+def create_recipes(count, authors, tag_ids, ingredient_ids, rng, image,
+                   batch_size=SEED_BATCH_SIZE):
+    """
+    Создает рецепты пакетами вместе с тегами и ингредиентами.
+    Авторы выбираются с помощью authors (PowerLawSampler).
+    Возвращает массив ключей рецептов.
+    """
+    ids = array('q')
+    for size in batches(count, batch_size):
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=author_id,
+                    name=' '.join(rng.choices(WORDS, k=3)).capitalize(),
+                    text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+                    cooking_time=rng.randint(5, 180),
+                    image=image
+                )
+                for author_id in authors.sample(size)
+            ])
+            TagRecipe.objects.bulk_create([
+                TagRecipe(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in rng.sample(
+                    tag_ids, min(len(tag_ids), rng.randint(1, 3)))
+            ])
+            IngredientRecipeAmountModel.objects.bulk_create([
+                IngredientRecipeAmountModel(
+                    recipe_id=recipe.pk, ingredient_id=ingredient_id,
+                    amount=rng.randint(MIN_AMOUNT, 500))
+                for recipe in recipes
+                for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    min(len(ingredient_ids), rng.randint(2, 12)))
+            ])
+        ids.extend(recipe.pk for recipe in recipes)
+    return ids
+
+
+def create_pairs(model, fields, count, left, right, distinct=False,
+                 batch_size=SEED_BATCH_SIZE):
+    """
+    Создает связи пользователь/объект, выбирая обе стороны
+    с помощью PowerLawSampler. Повторы пропускаются,
+    при distinct также пары с одинаковыми ключами.
+    Возвращает количество созданных строк.
+    """
+    created = 0
+    for size in batches(count, batch_size):
+        rows = {
+            pair for pair in zip(left.sample(size), right.sample(size))
+            if not distinct or pair[0] != pair[1]
+        }
+        created += copy_insert_ignore(model, fields, list(rows))
+    return created
+
+
+def read_jsonl(file):
+    """
+    Построчно читает дамп рецептов в формате JSON Lines.
+    Вместо некорректных строк возвращает None.
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield clean_recipe(item)
+
+
+def clean_recipe(item):
+    """
+    Проверяет рецепт из дампа:
+    {"author": "username", "name": ..., "text": ..., "cooking_time": ...,
+    "tags": ["slug"], "ingredients": [{"name": ..., "measurement_unit": ...,
+    "amount": ...}], "image": "media/recipes/..."}.
+    """
+    try:
+        recipe = {
+            'author': str(item['author']).strip(),
+            'name': str(item['name']).strip(),
+            'text': str(item['text']).strip(),
+            'cooking_time': int(item['cooking_time']),
+            'tags': [str(slug) for slug in item.get('tags', [])],
+            'image': item.get('image') or None,
+            'ingredients': {
+                (str(row['name']).strip(),
+                 str(row['measurement_unit']).strip()): int(row['amount'])
+                for row in item['ingredients']
+            },
+        }
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    if (not recipe['author'] or len(recipe['author']) > MAX_NAME
+            or not recipe['name'] or len(recipe['name']) > RECIPE_MAX_FIELDS
+            or not recipe['text'] or len(recipe['text']) > DESC_MAX_FIELD
+            or not 1 <= recipe['cooking_time'] <= MAX_SMALLINT
+            or not recipe['ingredients']):
+        return None
+    for (name, unit), amount in recipe['ingredients'].items():
+        if (not name or not unit or len(name) > MAX_INGREDIENT
+                or len(unit) > MAX_UNIT
+                or not MIN_AMOUNT <= amount <= MAX_SMALLINT):
+            return None
+    return recipe
+
+
+def import_recipes(recipes, tag_ids, image, password,
+                   batch_size=SEED_BATCH_SIZE):
+    """
+    Загружает рецепты из дампа пакетами. Недостающие авторы
+    и ингредиенты создаются, неизвестные теги пропускаются.
+    tag_ids: словарь slug -> ключ тега.
+    Возвращает количество загруженных и некорректных рецептов.
+    """
+    password = make_password(password)
+    imported = invalid = 0
+    recipes = iter(recipes)
+    while True:
+        batch = list(islice(recipes, batch_size))
+        if not batch:
+            return imported, invalid
+        valid = [recipe for recipe in batch if recipe is not None]
+        invalid += len(batch) - len(valid)
+        if not valid:
+            continue
+        with transaction.atomic():
+            authors = _authors({recipe['author'] for recipe in valid},
+                               password)
+            keys = {key for recipe in valid for key in recipe['ingredients']}
+            ingredients = _ingredients(keys)
+            created = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=authors[recipe['author']],
+                    name=recipe['name'],
+                    text=recipe['text'],
+                    cooking_time=recipe['cooking_time'],
+                    image=recipe['image'] or image
+                )
+                for recipe in valid
+            ])
+            TagRecipe.objects.bulk_create([
+                TagRecipe(recipe_id=instance.pk, tag_id=tag_ids[slug])
+                for instance, recipe in zip(created, valid)
+                for slug in set(recipe['tags']) if slug in tag_ids
+            ])
+            IngredientRecipeAmountModel.objects.bulk_create([
+                IngredientRecipeAmountModel(
+                    recipe_id=instance.pk, ingredient_id=ingredients[key],
+                    amount=amount)
+                for instance, recipe in zip(created, valid)
+                for key, amount in recipe['ingredients'].items()
+            ])
+        imported += len(created)
+
+
+def _authors(usernames, password):
+    authors = dict(User.objects.filter(
+        username__in=usernames).values_list('username', 'pk'))
+    missing = usernames - authors.keys()
+    if missing:
+        User.objects.bulk_create([
+            User(username=username,
+                 email=f'{username}@{SEED_EMAIL_DOMAIN}',
+                 first_name=username, last_name=username,
+                 password=password)
+            for username in missing
+        ], ignore_conflicts=True)
+        authors.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+    return authors
+
+
+def _ingredients(keys):
+    names = {name for name, _ in keys}
+
+    def existing():
+        return {
+            (name, unit): pk for pk, name, unit in Ingredient.objects.filter(
+                name__in=names).values_list('pk', 'name', 'measurement_unit')
+        }
+
+    ingredients = existing()
+    missing = keys - ingredients.keys()
+    if not missing:
+        return ingredients
+    if copy_insert_ignore(Ingredient, ('name', 'measurement_unit'),
+                          list(missing)):
+        bump_version(INGREDIENTS_VERSION)
+    return existing()
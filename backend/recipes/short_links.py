@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from string import ascii_letters, digits
+from threading import Lock
+from time import monotonic
+
+from django.core.cache import cache
+
+from core.constans import (SHORT_LINK_CACHE_SIZE, SHORT_LINK_CACHE_TIMEOUT,
+                           SHORT_LINK_LENGTH, SHORT_LINK_LOCAL_TTL,
+                           SHORT_LINK_MULTIPLIER)
+
+ALPHABET = digits + ascii_letters
+BASE = len(ALPHABET)
+
+
+def encode(number, length=0):
+    """
+    Число в base62, дополненное слева до length символов.
+    """
+    chars = []
+    while number:
+        number, remainder = divmod(number, BASE)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars)).rjust(length, ALPHABET[0])
+
+
+def decode(code):
+    """
+    Строка base62 в число.
+    """
+    number = 0
+    for char in code:
+        number = number * BASE + ALPHABET.index(char)
+    return number
+
+
+def make_code(recipe_id, length=None):
+    """
+    Код короткой ссылки рецепта.
+    Идентификатор переставляется умножением на число, взаимно простое
+    с 62**length, поэтому разные рецепты всегда получают разные коды,
+    а соседние рецепты - непохожие. Идентификаторы за пределами
+    диапазона кодируются как есть более длинным кодом.
+    Длина и множитель не настраиваются: от них зависят уже выданные коды.
+    """
+    length = length or SHORT_LINK_LENGTH
+    modulus = BASE ** length
+    if recipe_id >= modulus:
+        return encode(recipe_id)
+    return encode(recipe_id * SHORT_LINK_MULTIPLIER % modulus, length)
+
+
+def parse_code(code):
+    """
+    Идентификатор рецепта, которому соответствует код, или None.
+    """
+    if not code or any(char not in ALPHABET for char in code):
+        return None
+    number = decode(code)
+    if len(code) == SHORT_LINK_LENGTH:
+        modulus = BASE ** SHORT_LINK_LENGTH
+        number = number * pow(SHORT_LINK_MULTIPLIER, -1, modulus) % modulus
+    if not number or make_code(number) != code:
+        return None
+    return number
+
+
+def new_codes(recipe_ids):
+    """
+    Коды для новых коротких ссылок рецептов.
+    Код, уже занятый сохраненной ссылкой старого формата
+    (случайные SHORT_LINK_LENGTH символов), удлиняется на символ.
+    """
+    from recipes.models import ShortLink
+    codes = {recipe_id: make_code(recipe_id) for recipe_id in recipe_ids}
+    taken = set(ShortLink.objects.filter(
+        link__in=codes.values()).values_list('link', flat=True))
+    return {
+        recipe_id: (make_code(recipe_id, SHORT_LINK_LENGTH + 1)
+                    if code in taken else code)
+        for recipe_id, code in codes.items()
+    }
+
+
+class LRUCache:
+    """
+    Ограниченный по размеру кеш процесса.
+    Записи живут не дольше ttl секунд: удаление в другом процессе
+    сюда не доходит, и устаревшие значения должны истекать сами.
+    """
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_cache = LRUCache(SHORT_LINK_CACHE_SIZE, SHORT_LINK_LOCAL_TTL)
+
+
+def cache_key(code):
+    return f'short_link:{code}'
+
+
+def resolve_short_link(code):
+    """
+    Идентификатор рецепта по коду короткой ссылки.
+    Ищется в кеше процесса, затем в общем кеше, затем в базе данных.
+    Сохраненные коды, в том числе старого формата, имеют приоритет.
+    Коды, выданные без записи в базу, вычисляются из идентификатора.
+    """
+    recipe_id = local_cache.get(code)
+    if recipe_id is not None:
+        return recipe_id
+    recipe_id = cache.get(cache_key(code))
+    if recipe_id is None:
+        from recipes.models import Recipe, ShortLink
+        recipe_id = ShortLink.objects.filter(link=code).values_list(
+            'recipe_id', flat=True).first()
+        if recipe_id is None:
+            recipe_id = parse_code(code)
+            if recipe_id is not None and not Recipe.objects.filter(
+                pk=recipe_id, shortlink__isnull=True
+            ).exists():
+                recipe_id = None
+        if recipe_id is None:
+            return None
+        cache.set(cache_key(code), recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    local_cache.set(code, recipe_id)
+    return recipe_id
+
+
+def forget_short_link(code):
+    """
+    Удаляет код из кешей.
+    """
+    local_cache.delete(code)
+    cache.delete(cache_key(code))
@@ -0,0 +1,191 @@
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete, cleanup_pre_delete
+
+from core.constans import RECIPE_RENDITIONS, SEED_PLACEHOLDER
+from core.counters import is_cascade, shift_counter
+from core.images import (delete_renditions, image_changed, remember_image,
+                         schedule_renditions)
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartIngredient, ShortLink, Tag)
+from recipes.short_links import forget_short_link, make_code
+from recipes.versions import (TAGS_VERSION, bump_version,
+                              delete_recipe_cache)
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name', 'email', 'avatar'}
+
+USER_RECIPE_COUNTERS = {
+    FavoriteRecipe: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик рецептов автора.
+    """
+    if created:
+        shift_counter(User, [instance.author_id], 'recipes_count')
+
+
+@receiver(post_init, sender=Recipe)
+def recipe_loaded(sender, instance, **kwargs):
+    remember_image(instance, 'image')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, created, update_fields, **kwargs):
+    """
+    Ставит в очередь создание вариантов изменившегося
+    изображения рецепта.
+    """
+    if image_changed(instance, 'image', created, update_fields):
+        schedule_renditions(instance.image.name, RECIPE_RENDITIONS)
+
+
+@receiver(cleanup_pre_delete, sender=Recipe)
+def keep_seed_placeholder(sender, file, file_name, **kwargs):
+    """
+    Общее изображение сгенерированных рецептов не удаляется,
+    когда удаляется или меняет изображение один из них:
+    у файла без имени django_cleanup ничего не удаляет.
+    """
+    if file_name == SEED_PLACEHOLDER:
+        file.name = None
+
+
+@receiver(cleanup_post_delete, sender=Recipe)
+def recipe_image_deleted(sender, file_name, **kwargs):
+    """
+    Удаляет варианты удаленного изображения рецепта.
+    """
+    if file_name != SEED_PLACEHOLDER:
+        delete_renditions(file_name, RECIPE_RENDITIONS)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из списков покупок всех пользователей,
+    добавивших его. Строки корзины удаляются каскадом без построчных
+    обработчиков.
+    """
+    ShoppingCartIngredient.objects.remove_recipe(
+        list(ShoppingCart.objects.filter(
+            recipe=instance).values_list('user_id', flat=True)),
+        instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Уменьшает счетчик рецептов автора и удаляет рецепт из кешей.
+    При удалении самого автора счетчик не меняется.
+    """
+    if not is_cascade(sender, origin):
+        shift_counter(User, [instance.author_id], 'recipes_count', -1)
+    delete_recipe_cache(instance)
+    forget_short_link(make_code(instance.pk))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики избранного и списков покупок рецептов,
+    добавленных пользователем, по одному запросу на список.
+    Строки списков удаляются каскадом без построчных обработчиков.
+    """
+    for model, field in USER_RECIPE_COUNTERS.items():
+        shift_counter(Recipe, list(model.objects.filter(
+            user=instance).values_list('recipe_id', flat=True)), field, -1)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Обновляет версию рецептов автора при изменении его профиля,
+    чтобы закешированные представления рецептов устарели.
+    """
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+def user_recipe_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик избранного или списков покупок рецепта.
+    """
+    if created:
+        shift_counter(
+            Recipe, [instance.recipe_id], USER_RECIPE_COUNTERS[sender])
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+def user_recipe_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Уменьшает счетчик избранного или списков покупок рецепта.
+    """
+    if is_cascade(sender, origin):
+        return
+    shift_counter(
+        Recipe, [instance.recipe_id], USER_RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    """
+    Добавляет ингредиенты рецепта в суммарный список покупок.
+    """
+    if created:
+        ShoppingCartIngredient.objects.add_recipe(
+            [instance.user_id], instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из суммарного списка покупок.
+    Выполняется до удаления, пока ингредиенты рецепта еще существуют.
+    """
+    if is_cascade(sender, origin):
+        return
+    ShoppingCartIngredient.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """
+    Сбрасывает префиксный индекс и версию каталога ингредиентов.
+    """
+    invalidate_ingredient_index()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """
+    Обновляет версию каталога тегов.
+    """
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_delete, sender=ShortLink)
+def short_link_deleted(sender, instance, **kwargs):
+    """
+    Удаляет код короткой ссылки из кешей.
+    """
+    forget_short_link(instance.link)
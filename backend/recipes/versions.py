@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from time import time_ns
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from recipes.models import CatalogVersion
+
+
+TAGS_VERSION = 'tags_version'
+INGREDIENTS_VERSION = 'ingredients_version'
+
+
+def new_version():
+    """
+    Новая версия: время создания в наносекундах и случайная часть.
+    """
+    return f'{time_ns():x}.{uuid4().hex[:12]}'
+
+
+def version_time(version):
+    """
+    Время создания версии или None, если его нельзя определить.
+    """
+    try:
+        nanoseconds = int(version.partition('.')[0], 16)
+    except (AttributeError, ValueError):
+        return None
+    return datetime.fromtimestamp(nanoseconds / 1e9, tz=timezone.utc)
+
+
+def get_version(key):
+    """
+    Текущая версия набора данных из БД.
+    Если версии нет, создается новая.
+    """
+    return get_versions(key)[0]
+
+
+def get_versions(*keys):
+    """
+    Текущие версии нескольких наборов данных одним запросом.
+    """
+    versions = dict(CatalogVersion.objects.filter(
+        key__in=keys).values_list('key', 'version'))
+    for key in keys:
+        if key not in versions:
+            versions[key] = CatalogVersion.objects.get_or_create(
+                key=key, defaults={'version': new_version()})[0].version
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    """
+    Устанавливает новую версию набора данных.
+    Вызывается в транзакции, изменяющей набор данных.
+    """
+    version = new_version()
+    if not CatalogVersion.objects.filter(key=key).update(version=version):
+        CatalogVersion.objects.get_or_create(
+            key=key, defaults={'version': version})
+
+
+def recipe_cache_keys(recipes, versions=None):
+    """
+    Ключи кеша представлений рецептов.
+    Включают версию рецепта и версии каталогов тегов и ингредиентов.
+    Уже загруженные версии каталогов можно передать в versions.
+    """
+    if versions is None:
+        versions = get_versions(TAGS_VERSION, INGREDIENTS_VERSION)
+    return _cache_keys(recipes, ':'.join(versions))
+
+
+def _cache_keys(recipes, catalog):
+    return {
+        recipe.pk: (f'recipe:{recipe.pk}:'
+                    f'{recipe.updated_at.timestamp()}:{catalog}')
+        for recipe in recipes
+    }
+
+
+def delete_recipe_cache(recipe):
+    """
+    Удаляет представление рецепта из кеша.
+    """
+    cache.delete_many(recipe_cache_keys([recipe]).values())
@@ -12,7 +12,8 @@ class UserAdmin(BaseUserAdmin):
     Административная панель пользователя.
     """
     list_display = (
-        'id', 'email', 'username', 'first_name', 'last_name', 'avatar_image'
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar_image',
+        'recipes_count', 'subscribers_count'
     )
     list_filter = ('email', 'username',)
     search_fields = ('email', 'username', 'first_name', 'last_name',)
@@ -44,6 +45,7 @@ class SubscriptionAdmin(admin.ModelAdmin):
     Административная панель подписок.
     """
     list_display = ('id', 'user_username', 'following_username')
+    list_select_related = ('user', 'following')
     list_filter = ('user',)
     search_fields = ('user__username', 'following__username')
 
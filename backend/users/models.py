@@ -1,8 +1,14 @@
+import os
+from uuid import uuid4
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 
 from core.constans import MAX_EMAIL, MAX_NAME
+from core.counters import shift_counter
+from core.statements import delete_returning, insert_ignore
 
 
 class User(AbstractUser):
@@ -40,6 +46,16 @@ class User(AbstractUser):
         verbose_name='фото профиля',
         help_text='фото профиля'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'password', 'first_name', 'last_name')
@@ -52,6 +68,32 @@ class User(AbstractUser):
         return self.email
 
 
+class SubscriptionManager(models.Manager):
+    """
+    Подписка и отписка одним запросом с обновлением счетчика подписчиков.
+    """
+    @transaction.atomic
+    def subscribe(self, user_id, following_id):
+        """
+        Создает подписку. Возвращает False, если она уже есть.
+        """
+        created = insert_ignore(
+            self.model, ('user', 'following'), [(user_id, following_id)],
+            returning='following')
+        shift_counter(User, created, 'subscribers_count')
+        return bool(created)
+
+    @transaction.atomic
+    def unsubscribe(self, user_id, following_id):
+        """
+        Удаляет подписку. Возвращает False, если ее не было.
+        """
+        deleted = delete_returning(
+            self.model, 'following', user=user_id, following=following_id)
+        shift_counter(User, deleted, 'subscribers_count', -1)
+        return bool(deleted)
+
+
 class Subscription(models.Model):
     """Модель подписчиков."""
     user = models.ForeignKey(
@@ -61,6 +103,8 @@ class Subscription(models.Model):
         User, on_delete=models.CASCADE,
         related_name='followers')
 
+    objects = SubscriptionManager()
+
     class Meta:
         verbose_name = 'подписчик'
         verbose_name_plural = 'Подписчики'
@@ -77,3 +121,46 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.following}'
+
+
+class ImageUpload(models.Model):
+    """
+    Загрузка изображения по частям.
+    Файл собирается во временном каталоге, а токен загрузки
+    передается вместо base64 при создании рецепта или смене аватара.
+    """
+    token = models.UUIDField(
+        primary_key=True,
+        default=uuid4,
+        editable=False,
+        verbose_name='Токен'
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name='Пользователь'
+    )
+    size = models.PositiveBigIntegerField(verbose_name='Размер')
+    received = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Получено байт'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+
+    class Meta:
+        verbose_name = 'загрузка'
+        verbose_name_plural = 'Загрузки'
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_DIR, str(self.token))
+
+    @property
+    def complete(self):
+        return self.received == self.size
+
+    def __str__(self):
+        return f'{self.token} ({self.received}/{self.size})'
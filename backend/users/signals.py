@@ -0,0 +1,72 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+
+from core.constans import AVATAR_RENDITIONS
+from core.counters import is_cascade, shift_counter
+from core.images import (delete_renditions, image_changed, remember_image,
+                         schedule_renditions)
+from core.uploads import remove_file
+from users.models import ImageUpload, Subscription, User
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик подписчиков автора.
+    """
+    if created:
+        shift_counter(User, [instance.following_id], 'subscribers_count')
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Уменьшает счетчик подписчиков автора.
+    """
+    if is_cascade(sender, origin):
+        return
+    shift_counter(User, [instance.following_id], 'subscribers_count', -1)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики подписчиков авторов, на которых был подписан
+    пользователь, одним запросом. Подписки удаляются каскадом
+    без построчных обработчиков.
+    """
+    shift_counter(User, list(Subscription.objects.filter(
+        user=instance).values_list('following_id', flat=True)),
+        'subscribers_count', -1)
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    remember_image(instance, 'avatar')
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, created, update_fields, **kwargs):
+    """
+    Ставит в очередь создание вариантов изменившегося аватара.
+    """
+    if image_changed(instance, 'avatar', created, update_fields):
+        schedule_renditions(instance.avatar.name, AVATAR_RENDITIONS)
+
+
+@receiver(cleanup_post_delete, sender=User)
+def avatar_deleted(sender, file_name, **kwargs):
+    """
+    Удаляет варианты удаленного аватара.
+    """
+    delete_renditions(file_name, AVATAR_RENDITIONS)
+
+
+@receiver(post_delete, sender=ImageUpload)
+def upload_deleted(sender, instance, **kwargs):
+    """
+    Удаляет файл загрузки, если он еще не перенесен в хранилище.
+    """
+    remove_file(instance.path)